@@ -1,20 +1,13 @@
 import streamlit as st
-import mysql.connector
 import pandas as pd
 import plotly.express as px
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import re
 from chatbot import ScopusChatbot
-import os
-from dotenv import load_dotenv
-# Charger le fichier .env
-load_dotenv()
-
-MYSQL_HOST = os.getenv("MYSQL_HOST")
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_DB = os.getenv("MYSQL_DATABASE")
+from database import connection
+from dashboard_stats import ensure_tables, read_summary, read_title_frequencies, rebuild
+from author_index import AuthorIndex, load_author_index
 
 
 def detect_years_from_text(text):
@@ -116,104 +109,57 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class ChatbotDatabase:
-    def __init__(self):
-        self.db_config = {
-            'host': MYSQL_HOST,
-            'user': MYSQL_USER,
-            'password': MYSQL_PASSWORD,
-            'database': MYSQL_DB
-        }
-    
+    """Accès MySQL de l'application : connexions empruntées au pool partagé, requêtes préparées."""
+
     def get_connection(self):
-        try:
-            return mysql.connector.connect(**self.db_config)
-        except mysql.connector.Error as e:
-            st.error(f"Erreur de connexion à la base de données: {e}")
-            return None
+        # Connexion du pool, à utiliser avec `with`
+        return connection()
     
     @st.cache_data(ttl=600)
     def get_statistics(_self):
+        # Tables de synthèse tenues à jour au chargement : quelques centaines de lignes lues
         try:
-            conn = _self.get_connection()
-            if not conn:
-                return {}
-                
-            cursor = conn.cursor(dictionary=True)
-            stats = {}
-            
-            cursor.execute("SELECT COUNT(*) as total FROM article")
-            stats['total_articles'] = cursor.fetchone()['total']
-            
-            cursor.execute("SELECT COUNT(*) as total FROM author")
-            stats['total_authors'] = cursor.fetchone()['total']
-            
-            cursor.execute("SELECT COUNT(DISTINCT publication_year) as total FROM article WHERE publication_year IS NOT NULL")
-            stats['total_years'] = cursor.fetchone()['total']
-            
-            cursor.execute("""
-                SELECT publication_year, COUNT(*) as count 
-                FROM article 
-                WHERE publication_year IS NOT NULL 
-                GROUP BY publication_year 
-                ORDER BY publication_year DESC 
-                
-            """)
-            stats['articles_by_year'] = cursor.fetchall()
-            
-            cursor.execute("""
-                SELECT au.full_name, COUNT(*) as count 
-                FROM author au
-                JOIN author_article aa ON au.id = aa.author_id
-                GROUP BY au.id, au.full_name
-                ORDER BY count DESC 
-               
-            """)
-            stats['top_authors'] = cursor.fetchall()
-            
-            cursor.execute("SELECT title FROM article WHERE title IS NOT NULL")
-            titles = [row['title'] for row in cursor.fetchall()]
-            stats['titles_text'] = ' '.join(titles)
-            
-            cursor.close()
-            conn.close()
-            return stats
+            with _self.get_connection() as conn:
+                ensure_tables(conn)
+                stats = read_summary(conn)
+                if stats is None:
+                    # Première utilisation : calcul initial à partir des tables de base
+                    rebuild(conn)
+                    stats = read_summary(conn)
+            return stats or {}
             
         except Exception as e:
             st.error(f"Erreur statistiques: {e}")
             return {}
     
-    def get_authors_list(self):
+    @st.cache_data(ttl=600)
+    def get_title_frequencies(_self, year_from=None, year_to=None, authors=()):
         try:
-            conn = self.get_connection()
-            if not conn:
-                return []
-                
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT DISTINCT full_name FROM author ORDER BY full_name")
-            authors = [row['full_name'] for row in cursor.fetchall()]
-            cursor.close()
-            conn.close()
-            return authors
+            with _self.get_connection() as conn:
+                return read_title_frequencies(conn, year_from=year_from, year_to=year_to, authors=list(authors))
+        except Exception as e:
+            st.error(f"Erreur nuage de mots: {e}")
+            return {}
+    
+    @st.cache_resource(ttl=600)
+    def get_author_index(_self):
+        # Index des noms chargé une fois pour toutes les sessions : l'autocomplétion ne touche plus la base
+        try:
+            with _self.get_connection() as conn:
+                return load_author_index(conn)
             
         except Exception as e:
             st.error(f"Erreur lors de la récupération des auteurs: {e}")
-            return []
+            return AuthorIndex([])
     
     def get_years_range(self):
         try:
-            conn = self.get_connection()
-            if not conn:
-                return (2000, 2025)
-                
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT MIN(publication_year) as min_year, MAX(publication_year) as max_year 
-                FROM article 
-                WHERE publication_year IS NOT NULL
-            """)
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with self.get_connection() as conn:
+                result = conn.query_one("""
+                    SELECT MIN(publication_year) as min_year, MAX(publication_year) as max_year 
+                    FROM article 
+                    WHERE publication_year IS NOT NULL
+                """)
             
             if result and result['min_year'] and result['max_year']:
                 return (int(result['min_year']), int(result['max_year']))
@@ -227,6 +173,20 @@ class ChatbotDatabase:
 def init_database():
     return ChatbotDatabase()
 
+@st.cache_resource
+def init_chatbot():
+    # Une seule instance par processus : modèle et index partagés entre les sessions
+    return ScopusChatbot()
+
+def author_filter(db, label, key):
+    # Autocomplétion : saisie d'un début de nom, suggestions tirées de l'index des auteurs
+    author_index = db.get_author_index()
+    search = st.text_input(f"{label} (début du nom)", key=f"{key}_search")
+    selected = st.session_state.get(key, [])
+    # Les auteurs déjà choisis restent dans les options quand la saisie change
+    options = list(dict.fromkeys(selected + author_index.suggest(search))) if search else selected
+    return st.multiselect(label, options=options, key=key)
+
 def display_authors(authors):
     if not authors or authors.strip() == "Auteurs inconnus":
         return ""
@@ -252,15 +212,11 @@ def display_authors(authors):
 
     return ' '.join(author_tags)
 
-def create_word_cloud(text):
+def create_word_cloud(frequencies):
     try:
-        text = re.sub(r'[^\w\s]', '', text.lower())
-        words = text.split()
-        stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
-        words = [word for word in words if word not in stop_words and len(word) > 3]
-        
-        if words:
-            wordcloud = WordCloud(width=800, height=400, background_color='white', colormap='Blues', max_words=50).generate(' '.join(words))
+        # Fréquences des termes des titres, précalculées (tables de synthèse)
+        if frequencies:
+            wordcloud = WordCloud(width=800, height=400, background_color='white', colormap='Blues', max_words=50).generate_from_frequencies(frequencies)
             fig, ax = plt.subplots(figsize=(10, 5))
             ax.imshow(wordcloud, interpolation='bilinear')
             ax.axis('off')
@@ -320,10 +276,14 @@ def page_chatbot():
         st.session_state.messages.append({"role": "user", "content": user_input})
         
         with st.spinner("Recherche en cours..."):
-            raw_results = sorted(
-                st.session_state.scopus_chatbot.search_engine.search(user_input, k=100),
-                key=lambda x: x.get('publication_year', 0),
-                reverse=True
+            # Les filtres année / auteurs sont appliqués pendant la recherche FAISS ;
+            # les résultats arrivent re-classés par pertinence
+            raw_results = st.session_state.scopus_chatbot.search_engine.search(
+                user_input,
+                k=100,
+                year_from=st.session_state.filters['year_from'],
+                year_to=st.session_state.filters['year_to'],
+                authors=st.session_state.filters['authors']
             )
             
             already_shown = st.session_state.shown_results.get(user_input, [])
@@ -332,25 +292,7 @@ def page_chatbot():
                 new_results = raw_results
                 st.session_state.shown_results[user_input] = []
             
-            filtered_results = []
-            for article in new_results:
-                year_ok = True
-                pub_year = article.get('publication_year')
-                if pub_year and str(pub_year).isdigit():
-                    pub_year = int(pub_year)
-                    year_ok = st.session_state.filters['year_from'] <= pub_year <= st.session_state.filters['year_to']
-                
-                authors_ok = True
-                if st.session_state.filters['authors']:
-                    authors = article.get('authors', [])
-                    if isinstance(authors, str):
-                        authors = [a.strip() for a in authors.split(',')]
-                    authors_ok = any(author in authors for author in st.session_state.filters['authors'])
-                
-                if year_ok and authors_ok:
-                    filtered_results.append(article)
-                if len(filtered_results) >= 2:
-                    break
+            filtered_results = new_results[:2]
             
             st.session_state.shown_results.setdefault(user_input, []).extend(filtered_results)
 
@@ -403,9 +345,22 @@ def page_statistiques():
         st.header(" Visualisations")
         create_visualizations(stats)
         
-        # Nuage de mots
+        # Nuage de mots, filtrable par période et par auteurs
         st.header("☁️ Nuage de mots des titres")
-        create_word_cloud(stats.get('titles_text', ''))
+        years = db.get_years_range()
+        col1, col2 = st.columns(2)
+        with col1:
+            year_range = years
+            if years[0] < years[1]:
+                year_range = st.slider("Période", min_value=years[0], max_value=years[1], value=years, key='cloud_years')
+        with col2:
+            cloud_authors = author_filter(db, "Auteurs", 'cloud_authors')
+        
+        if year_range == years and not cloud_authors:
+            frequencies = stats.get('title_frequencies', {})
+        else:
+            frequencies = db.get_title_frequencies(year_range[0], year_range[1], tuple(cloud_authors))
+        create_word_cloud(frequencies)
     else:
         st.error("Impossible de charger les statistiques")
 
@@ -430,12 +385,7 @@ def page_recherche_avancee():
             year_to = st.number_input("Année maximale", min_value=years[0], max_value=years[1], value=years[1], step=1)
         
         with col2:
-            authors_list = db.get_authors_list()
-            selected_authors = st.multiselect(
-                "Sélectionner des auteurs",
-                options=authors_list,
-                key='advanced_author_filter'
-            )
+            selected_authors = author_filter(db, "Sélectionner des auteurs", 'advanced_author_filter')
     
     # Section de recherche
     st.header("🔎 Recherche")
@@ -446,24 +396,14 @@ def page_recherche_avancee():
             st.warning("Veuillez entrer un mot-clé pour la recherche avancée.")
         else:
             with st.spinner("Recherche en cours..."):
-                chatbot = ScopusChatbot()
-                results = chatbot.search_engine.search(advanced_query, k=50)
-
-                filtered_advanced_results = []
-                for article in results:
-                    year_ok = True
-                    pub_year = article.get('publication_year')
-                    if pub_year and str(pub_year).isdigit():
-                        pub_year = int(pub_year)
-                        year_ok = year_from <= pub_year <= year_to
-                    authors_ok = True
-                    if selected_authors:
-                        authors = article.get('authors', [])
-                        if isinstance(authors, str):
-                            authors = [a.strip() for a in authors.split(',')]
-                        authors_ok = any(author in authors for author in selected_authors)
-                    if year_ok and authors_ok:
-                        filtered_advanced_results.append(article)
+                chatbot = init_chatbot()
+                filtered_advanced_results = chatbot.search_engine.search(
+                    advanced_query,
+                    k=50,
+                    year_from=int(year_from),
+                    year_to=int(year_to),
+                    authors=selected_authors
+                )
 
                 st.subheader(f"📋 Résultats ({len(filtered_advanced_results)} )")
                 if filtered_advanced_results:
@@ -483,7 +423,7 @@ def main():
     # Initialisation des variables de session
     db = init_database()
     if 'scopus_chatbot' not in st.session_state:
-        st.session_state.scopus_chatbot = ScopusChatbot()
+        st.session_state.scopus_chatbot = init_chatbot()
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'filters' not in st.session_state:
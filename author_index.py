@@ -0,0 +1,127 @@
+import bisect
+import unicodedata
+
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# Nombre minimal de trigrammes communs pour qu'un nom soit candidat en recherche approchée
+MIN_SHARED_TRIGRAMS = 2
+
+
+def normalize_name(name: str) -> str:
+    # "  Élad   HAZAN " -> "elad hazan" : casse, accents et espaces ignorés (comme utf8mb4_general_ci)
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _trigrams(key: str) -> set:
+    # Trigrammes de chaque mot : le nom de famille seul retrouve le nom complet
+    trigrams = set()
+    for token in key.split():
+        padded = f"  {token} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class AuthorIndex:
+    """Index en mémoire des noms d'auteurs : recherche exacte, par préfixe et approchée.
+
+    Chaque nom est rangé dans un tableau trié sous toutes ses fins de nom ("elad hazan",
+    "hazan") : un préfixe tapé sur le prénom ou le nom de famille se résout par bisection.
+    Un index de trigrammes sert de repli pour les fautes de frappe.
+    """
+
+    def __init__(self, authors: Iterable[Tuple[int, str]]):
+        self.ids: Dict[str, List[int]] = {}
+        self.names: List[str] = []
+        positions: Dict[str, int] = {}
+        for author_id, full_name in authors:
+            name = (full_name or "").strip()
+            if not name:
+                continue
+            if name not in positions:
+                positions[name] = len(self.names)
+                self.names.append(name)
+            self.ids.setdefault(normalize_name(name), []).append(author_id)
+
+        entries = []
+        self._trigram_postings: Dict[str, List[int]] = {}
+        self._keys = []
+        for pos, name in enumerate(self.names):
+            key = normalize_name(name)
+            self._keys.append(key)
+            tokens = key.split()
+            for i in range(len(tokens)):
+                entries.append((" ".join(tokens[i:]), pos))
+            for trigram in _trigrams(key):
+                self._trigram_postings.setdefault(trigram, []).append(pos)
+        entries.sort()
+        self._suffixes = [entry[0] for entry in entries]
+        self._positions = [entry[1] for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, name: str) -> List[int]:
+        """IDs des auteurs portant exactement ce nom (casse et accents ignorés)."""
+        return list(self.ids.get(normalize_name(name), []))
+
+    def prefix(self, query: str, limit: int = 20) -> List[str]:
+        key = normalize_name(query)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._suffixes, key)
+        found = []
+        seen = set()
+        for i in range(start, len(self._suffixes)):
+            if not self._suffixes[i].startswith(key):
+                break
+            pos = self._positions[i]
+            if pos not in seen:
+                seen.add(pos)
+                found.append(pos)
+        # Les noms qui commencent par le préfixe d'abord, puis ordre alphabétique
+        found.sort(key=lambda pos: (not self._keys[pos].startswith(key), self._keys[pos]))
+        return [self.names[pos] for pos in found[:limit]]
+
+    def fuzzy(self, query: str, limit: int = 20, min_overlap: float = 0.5) -> List[str]:
+        key = normalize_name(query)
+        if not key:
+            return []
+        query_trigrams = _trigrams(key)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigram_postings.get(trigram, ()))
+
+        scored = []
+        for pos, count in shared.items():
+            # Part des trigrammes de la saisie retrouvés dans le nom : une saisie partielle reste comparable
+            overlap = count / len(query_trigrams)
+            if count >= MIN_SHARED_TRIGRAMS and overlap >= min_overlap:
+                # À recouvrement égal, le nom le plus court (le plus proche de la saisie) d'abord
+                scored.append((-overlap, len(self._keys[pos]), self._keys[pos], pos))
+        scored.sort()
+        return [self.names[entry[-1]] for entry in scored[:limit]]
+
+    def suggest(self, query: str, limit: int = 20) -> List[str]:
+        """Autocomplétion : correspondances par préfixe, complétées par la recherche approchée."""
+        suggestions = self.prefix(query, limit)
+        if len(suggestions) < limit:
+            suggestions += [name for name in self.fuzzy(query, limit) if name not in suggestions]
+        return suggestions[:limit]
+
+
+def ensure_full_name_index(conn):
+    """Ajoute la clé `full_name` sur `author` aux bases créées avant qu'elle existe."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW INDEX FROM author WHERE Key_name = 'full_name'")
+        if not cursor.fetchall():
+            cursor.execute("ALTER TABLE author ADD KEY full_name (full_name)")
+    finally:
+        cursor.close()
+
+
+def load_author_index(conn) -> AuthorIndex:
+    return AuthorIndex((row["id"], row["full_name"]) for row in conn.query("SELECT id, full_name FROM author"))
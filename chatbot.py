@@ -1,16 +1,27 @@
-from search_engine import ScopusSearchEngine
+from search_engine import get_search_engine
 
 class ScopusChatbot:
-    def __init__(self):
-        self.search_engine = ScopusSearchEngine()
+    def __init__(self, search_engine=None):
+        # Moteur partagé par défaut : le modèle et l'index ne sont chargés qu'une fois par processus
+        self.search_engine = search_engine or get_search_engine()
 
     def process_query(self, query: str) -> str:
-        if not query.strip():
-            return "Veuillez saisir une question valide."
+        return self.process_queries([query])[0]
+
+    def process_queries(self, queries: list) -> list:
+        """Traite plusieurs questions avec une seule recherche groupée."""
+        valid = [i for i, query in enumerate(queries) if query.strip()]
+        responses = ["Veuillez saisir une question valide."] * len(queries)
 
         # Appel avec le seuil de similarité explicite
-        results = self.search_engine.search(query, k=5)
+        batch_results = self.search_engine.search_batch([queries[i] for i in valid], k=5)
+
+        for i, results in zip(valid, batch_results):
+            responses[i] = self.format_response(results)
+
+        return responses
 
+    def format_response(self, results: list) -> str:
         if not results:
             return "Désolé, aucun article correspondant n'a été trouvé."
 
@@ -4959,7 +4959,8 @@ ALTER TABLE `article`
 -- Index pour la table `author`
 --
 ALTER TABLE `author`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `full_name` (`full_name`);
 
 --
 -- Index pour la table `author_article`
@@ -0,0 +1,109 @@
+import time
+import pandas as pd
+
+from typing import Any, Dict, List, Optional
+from near_duplicates import NearDuplicateIndex
+
+TEXT_COLUMNS = ['title', 'abstract', 'journal_name', 'doi', 'arxiv_identifier', 'keywords', 'subject_areas', 'pdf_url']
+
+# http://arxiv.org/abs/1909.03550v1 -> 1909.03550
+ARXIV_URL_PREFIX = r'^https?://(?:export\.)?arxiv\.org/(?:abs|pdf)/'
+ARXIV_VERSION_SUFFIX = r'v\d+$'
+
+
+def canonical_arxiv_ids(ids: pd.Series) -> pd.Series:
+    return (
+        ids.fillna('').astype(str).str.strip()
+        .str.replace(ARXIV_URL_PREFIX, '', regex=True)
+        .str.replace(ARXIV_VERSION_SUFFIX, '', regex=True)
+    )
+
+
+def parse_years(values: pd.Series) -> pd.Series:
+    # "2019", "2019-05-01", 2019 -> 2019 ; valeurs vides ou invalides -> <NA>
+    return pd.to_numeric(values.astype(str).str[:4], errors='coerce').astype('Int64')
+
+
+class CorpusCleaner:
+    """Nettoyage colonne par colonne et dédoublonnage des articles, partagé par l'extraction et le chargement.
+
+    Les titres et identifiants canoniques déjà vus sont conservés d'un appel à l'autre :
+    le corpus peut être traité morceau par morceau. Avec `near_duplicates`, les versions
+    légèrement modifiées d'un article déjà vu (titre + résumé) sont aussi écartées.
+    """
+
+    def __init__(self, near_duplicates: Optional[NearDuplicateIndex] = None):
+        self.seen_titles = set()
+        self.seen_ids = set()
+        self.near_duplicates = near_duplicates
+        # identifiant canonique écarté -> identifiant canonique du représentant conservé
+        self.near_duplicate_of = {}
+        self.rows_in = 0
+        self.rows_out = 0
+        self.seconds = 0.0
+
+    def clean(self, df: pd.DataFrame) -> pd.DataFrame:
+        start = time.perf_counter()
+        df = df.copy()
+
+        #  Normalisation texte
+        for col in TEXT_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].fillna('').astype(str).str.strip()
+        if 'arxiv_identifier' in df.columns:
+            df['canonical_id'] = canonical_arxiv_ids(df['arxiv_identifier'])
+        if 'publication_year' in df.columns:
+            df['publication_year'] = parse_years(df['publication_year'])
+
+        #  Doublons : même titre ou même article arXiv (toutes versions confondues),
+        #  dans ce morceau ou dans les précédents. Comme drop_duplicates appliqué colonne
+        #  après colonne : les identifiants ne sont comparés qu'entre lignes gardées sur le
+        #  titre, et seules les lignes conservées marquent leurs clés comme vues.
+        rows_in = len(df)
+        if 'title' in df.columns:
+            df = df[~(df['title'].duplicated() | df['title'].isin(self.seen_titles))]
+        if 'canonical_id' in df.columns:
+            df = df[~(df['canonical_id'].duplicated() | df['canonical_id'].isin(self.seen_ids))]
+
+        if 'title' in df.columns:
+            self.seen_titles.update(df['title'])
+        if 'canonical_id' in df.columns:
+            self.seen_ids.update(df['canonical_id'])
+
+        if self.near_duplicates is not None and len(df):
+            df = self._collapse_near_duplicates(df)
+
+        self.rows_in += rows_in
+        self.rows_out += len(df)
+        self.seconds += time.perf_counter() - start
+        return df
+
+    def _collapse_near_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        keys = df['canonical_id'] if 'canonical_id' in df.columns else df.index.to_series()
+        texts = df.get('title', '') + ' ' + df.get('abstract', '')
+        keep = []
+        for key, text in zip(keys, texts):
+            representative = self.near_duplicates.add(key, text)
+            keep.append(representative is None)
+            if representative is not None:
+                self.near_duplicate_of[key] = representative
+        return df[keep]
+
+    @staticmethod
+    def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        # Valeurs manquantes (<NA>, NaN) -> None pour la sérialisation JSON
+        return df.astype(object).where(df.notna(), None).to_dict('records')
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "duplicates": self.rows_in - self.rows_out,
+            "near_duplicates": len(self.near_duplicate_of),
+            "rows_per_second": self.rows_in / self.seconds if self.seconds > 0 else 0.0,
+        }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (f"Nettoyage : {stats['rows_in']} lignes, {stats['duplicates']} doublons retirés "
+                f"dont {stats['near_duplicates']} quasi-doublons ({stats['rows_per_second']:.0f} lignes/s)")
@@ -0,0 +1,85 @@
+import os
+import gzip
+import json
+import argparse
+
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Corpus au format JSON Lines : un article par ligne, compressé si le nom finit par .gz
+CORPUS_PATH = "data/arxiv_data.jsonl"
+# Ancien format : un tableau JSON indenté
+LEGACY_JSON_PATH = "data/arxiv_data.json"
+
+
+def open_corpus(path: str, mode: str = "r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def default_corpus_path() -> str:
+    # Le corpus JSONL est prioritaire ; le tableau JSON reste lisible en repli
+    for path in (CORPUS_PATH, CORPUS_PATH + ".gz", LEGACY_JSON_PATH):
+        if os.path.exists(path):
+            return path
+    return CORPUS_PATH
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Lit le corpus enregistrement par enregistrement (mémoire constante en JSONL)."""
+    if path.endswith(".json"):
+        # Ancien format : le tableau doit être chargé en entier
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with open_corpus(path) as f:
+        try:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par un arrêt brutal de l'extraction
+                    print(f" Ligne {line_number} illisible ignorée dans '{path}'")
+        except EOFError:
+            # .jsonl.gz tronqué au même moment : gzip lève EOFError en fin de flux
+            print(f" Fin de fichier compressé tronquée ignorée dans '{path}'")
+
+
+def iter_batches(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def append_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    count = 0
+    with open_corpus(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def convert(source: str, target: str) -> int:
+    """Convertit un corpus (JSON ou JSONL, compressé ou non) vers `target`."""
+    if os.path.exists(target):
+        os.remove(target)
+    return append_records(target, iter_records(source))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversion du corpus arXiv au format JSON Lines")
+    parser.add_argument("source", nargs="?", default=LEGACY_JSON_PATH, help="Corpus source (.json, .jsonl, .jsonl.gz)")
+    parser.add_argument("target", nargs="?", default=CORPUS_PATH, help="Corpus cible (.jsonl ou .jsonl.gz)")
+    args = parser.parse_args()
+
+    total = convert(args.source, args.target)
+    print(f"{total} articles écrits dans '{args.target}'")
@@ -0,0 +1,315 @@
+import re
+
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Nombre de lignes lues par le tableau de bord
+TOP_AUTHORS = 50
+TOP_TERMS = 200
+# Longueur maximale d'un terme stocké (clé de stats_title_term)
+MAX_TERM_LENGTH = 100
+
+STOP_WORDS = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
+
+# Tables de synthèse, tenues à jour à chaque chargement par data_cleaning.py
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_total (
+        name VARCHAR(32) NOT NULL PRIMARY KEY,
+        value BIGINT NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_year (
+        publication_year INT NOT NULL PRIMARY KEY,
+        article_count INT NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_author (
+        author_id INT NOT NULL PRIMARY KEY,
+        full_name VARCHAR(255) NOT NULL,
+        article_count INT NOT NULL,
+        KEY article_count (article_count)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_title_term (
+        term VARCHAR(100) NOT NULL PRIMARY KEY,
+        frequency INT NOT NULL,
+        KEY frequency (frequency)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_title_term_year (
+        publication_year INT NOT NULL,
+        term VARCHAR(100) NOT NULL,
+        frequency INT NOT NULL,
+        PRIMARY KEY (publication_year, term)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin
+    """,
+]
+
+TOTAL_UPSERT = """
+    INSERT INTO stats_total (name, value) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+"""
+YEAR_UPSERT = """
+    INSERT INTO stats_year (publication_year, article_count) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE article_count = article_count + VALUES(article_count)
+"""
+AUTHOR_UPSERT = """
+    INSERT INTO stats_author (author_id, full_name, article_count) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE article_count = article_count + VALUES(article_count)
+"""
+TERM_UPSERT = """
+    INSERT INTO stats_title_term (term, frequency) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE frequency = frequency + VALUES(frequency)
+"""
+YEAR_TERM_UPSERT = """
+    INSERT INTO stats_title_term_year (publication_year, term, frequency) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE frequency = frequency + VALUES(frequency)
+"""
+# Ligne de stats_total présente pendant un chargement : si elle subsiste, le chargement a été
+# interrompu entre ses insertions et l'ajout de son delta
+STALE = "stale"
+STALE_MARK = "INSERT INTO stats_total (name, value) VALUES (%s, 1) ON DUPLICATE KEY UPDATE value = 1"
+STALE_CLEAR = "DELETE FROM stats_total WHERE name = %s"
+
+
+def title_terms(title: Optional[str]) -> List[str]:
+    # Même découpage que l'ancien nuage de mots : ponctuation retirée, mots vides et mots courts exclus
+    words = re.sub(r'[^\w\s]', '', (title or '').lower()).split()
+    return [word for word in words if word not in STOP_WORDS and 3 < len(word) <= MAX_TERM_LENGTH]
+
+
+class StatsDelta:
+    """Contributions d'un chargement aux tables de synthèse (articles, auteurs et liens réellement insérés)."""
+
+    def __init__(self):
+        self.articles = 0
+        self.authors = 0
+        self.years = Counter()
+        self.terms = Counter()
+        self.year_terms = Counter()
+        self.author_articles = Counter()
+        self.author_names = {}
+
+    def add_article(self, publication_year: Optional[int], title: Optional[str]):
+        self.articles += 1
+        terms = title_terms(title)
+        self.terms.update(terms)
+        if publication_year is not None:
+            self.years[publication_year] += 1
+            self.year_terms.update((publication_year, term) for term in terms)
+
+    def add_author(self):
+        self.authors += 1
+
+    def add_link(self, author_id: int, full_name: str):
+        self.author_articles[author_id] += 1
+        self.author_names[author_id] = full_name
+
+    def __bool__(self) -> bool:
+        return bool(self.articles or self.authors or self.author_articles)
+
+
+def ensure_tables(conn):
+    cursor = conn.cursor()
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    cursor.close()
+    conn.commit()
+
+
+def mark_stale(conn):
+    """À appeler avant les insertions d'un chargement : les synthèses sont marquées périmées
+    jusqu'à `apply_delta`. Si la marque d'un chargement précédent subsiste, celui-ci s'est
+    interrompu avant d'ajouter son delta : recalcul complet d'abord.
+    """
+    ensure_tables(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM stats_total WHERE name = %s", (STALE,))
+        interrupted = cursor.fetchone()[0] > 0
+    finally:
+        cursor.close()
+    if interrupted:
+        rebuild(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(STALE_MARK, (STALE,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def apply_delta(conn, delta: StatsDelta):
+    """Ajoute `delta` aux tables de synthèse et retire la marque de `mark_stale`, en une transaction."""
+    ensure_tables(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM stats_total WHERE name = 'articles'")
+    if cursor.fetchone()[0] == 0:
+        # Tables de synthèse neuves sur une base déjà remplie : le delta n'en couvrirait
+        # qu'une partie, recalcul complet (les lignes de ce chargement sont déjà en base)
+        cursor.close()
+        rebuild(conn)
+        return
+    try:
+        cursor.execute(STALE_CLEAR, (STALE,))
+        if not delta:
+            conn.commit()
+            return
+        cursor.executemany(TOTAL_UPSERT, [("articles", delta.articles), ("authors", delta.authors)])
+        if delta.years:
+            cursor.executemany(YEAR_UPSERT, list(delta.years.items()))
+        if delta.author_articles:
+            cursor.executemany(AUTHOR_UPSERT, [
+                (author_id, delta.author_names[author_id], count)
+                for author_id, count in delta.author_articles.items()
+            ])
+        if delta.terms:
+            cursor.executemany(TERM_UPSERT, list(delta.terms.items()))
+        if delta.year_terms:
+            cursor.executemany(YEAR_TERM_UPSERT, [(year, term, count) for (year, term), count in delta.year_terms.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def rebuild(conn, batch_size: int = 1000):
+    """Recalcule les tables de synthèse à partir des tables de base (première mise en place ou réparation).
+
+    Retire aussi la marque d'un chargement interrompu.
+    """
+    ensure_tables(conn)
+    cursor = conn.cursor()
+    try:
+        for table in ("stats_total", "stats_year", "stats_author", "stats_title_term", "stats_title_term_year"):
+            cursor.execute(f"DELETE FROM {table}")
+        cursor.execute("""
+            INSERT INTO stats_total (name, value)
+            SELECT 'articles', COUNT(*) FROM article
+            UNION ALL
+            SELECT 'authors', COUNT(*) FROM author
+        """)
+        cursor.execute("""
+            INSERT INTO stats_year (publication_year, article_count)
+            SELECT publication_year, COUNT(*) FROM article
+            WHERE publication_year IS NOT NULL
+            GROUP BY publication_year
+        """)
+        cursor.execute("""
+            INSERT INTO stats_author (author_id, full_name, article_count)
+            SELECT au.id, au.full_name, COUNT(*)
+            FROM author au
+            JOIN author_article aa ON au.id = aa.author_id
+            GROUP BY au.id, au.full_name
+        """)
+
+        # Fréquences des termes : même calcul que pendant le chargement
+        delta = StatsDelta()
+        cursor.execute("SELECT publication_year, title FROM article WHERE title IS NOT NULL")
+        for year, title in cursor.fetchall():
+            delta.add_article(year, title)
+        for statement, items in (
+            (TERM_UPSERT, list(delta.terms.items())),
+            (YEAR_TERM_UPSERT, [(year, term, count) for (year, term), count in delta.year_terms.items()]),
+        ):
+            for start in range(0, len(items), batch_size):
+                cursor.executemany(statement, items[start:start + batch_size])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def read_title_frequencies(conn, year_from: Optional[int] = None, year_to: Optional[int] = None,
+                           authors: Optional[List[str]] = None, top_terms: int = TOP_TERMS) -> Dict[str, int]:
+    """Fréquences des termes des titres, éventuellement restreintes à une période et à des auteurs.
+
+    Sans auteur, tout vient des tables de synthèse. Avec des auteurs, seuls les titres de leurs
+    articles sont relus : leur nombre dépend des auteurs choisis, pas de la taille du corpus.
+    """
+    if authors:
+        placeholders = ", ".join(["%s"] * len(authors))
+        conditions, params = [f"au.full_name IN ({placeholders})"], list(authors)
+        if year_from is not None:
+            conditions.append("a.publication_year >= %s")
+            params.append(year_from)
+        if year_to is not None:
+            conditions.append("a.publication_year <= %s")
+            params.append(year_to)
+        rows = conn.query(f"""
+            SELECT DISTINCT a.id, a.title
+            FROM article a
+            JOIN author_article aa ON a.id = aa.article_id
+            JOIN author au ON aa.author_id = au.id
+            WHERE {' AND '.join(conditions)}
+        """, params)
+        terms = Counter()
+        for row in rows:
+            terms.update(title_terms(row["title"]))
+        return dict(terms.most_common(top_terms))
+
+    if year_from is None and year_to is None:
+        rows = conn.query("""
+            SELECT term, frequency
+            FROM stats_title_term
+            ORDER BY frequency DESC
+            LIMIT %s
+        """, (top_terms,))
+    else:
+        rows = conn.query("""
+            SELECT term, SUM(frequency) as frequency
+            FROM stats_title_term_year
+            WHERE publication_year BETWEEN %s AND %s
+            GROUP BY term
+            ORDER BY frequency DESC
+            LIMIT %s
+        """, (year_from if year_from is not None else -2 ** 31, year_to if year_to is not None else 2 ** 31 - 1, top_terms))
+    return {row["term"]: int(row["frequency"]) for row in rows}
+
+
+def read_summary(conn, top_authors: int = TOP_AUTHORS, top_terms: int = TOP_TERMS) -> Optional[Dict[str, Any]]:
+    """Statistiques du tableau de bord lues dans les tables de synthèse ; None si elles sont vides."""
+    totals = {row["name"]: row["value"] for row in conn.query("SELECT name, value FROM stats_total")}
+    if "articles" not in totals:
+        return None
+
+    articles_by_year = conn.query("""
+        SELECT publication_year, article_count as count
+        FROM stats_year
+        WHERE article_count > 0
+        ORDER BY publication_year DESC
+    """)
+    # LIMIT sur la clé article_count : seules les premières lignes de l'index sont lues
+    authors = conn.query("""
+        SELECT full_name, article_count as count
+        FROM stats_author
+        ORDER BY article_count DESC
+        LIMIT %s
+    """, (top_authors,))
+    return {
+        "total_articles": int(totals["articles"]),
+        "total_authors": int(totals.get("authors", 0)),
+        "total_years": len(articles_by_year),
+        "articles_by_year": articles_by_year,
+        "top_authors": authors,
+        "title_frequencies": read_title_frequencies(conn, top_terms=top_terms),
+    }
+
+
+if __name__ == "__main__":
+    from database import connection
+
+    with connection() as conn:
+        rebuild(conn)
+        summary = read_summary(conn)
+    print(f"Tables de synthèse recalculées : {summary['total_articles']} articles, "
+          f"{summary['total_authors']} auteurs, {summary['total_years']} années")
@@ -1,8 +1,14 @@
 import os
-import json
+import time
+import argparse
 import pandas as pd
 from dotenv import load_dotenv
-import mysql.connector
+from database import connection
+from corpus import default_corpus_path, iter_batches, iter_records
+from cleaning import CorpusCleaner
+from near_duplicates import NearDuplicateIndex
+from dashboard_stats import StatsDelta, apply_delta, mark_stale, rebuild
+from author_index import ensure_full_name_index, normalize_name
 
 # Charger .env
 load_dotenv()
@@ -15,123 +21,297 @@ MYSQL_DB = os.getenv("MYSQL_DATABASE")
 if not all([MYSQL_HOST, MYSQL_USER, MYSQL_DB]):
     raise ValueError(" Erreur : une variable d'environnement est manquante. Vérifie ton fichier .env !")
 
-#  Connexion MySQL propre
-db = mysql.connector.connect(
-    host=MYSQL_HOST,
-    user=MYSQL_USER,
-    password=MYSQL_PASSWORD,
-    database=MYSQL_DB,
-    buffered=True
-)
-
-cursor = db.cursor()
-
-#  Chemin du JSON
-DATA_PATH = "data/arxiv_data.json"
-
-# Charger JSON dans un DataFrame pandas
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    raw_data = json.load(f)
-
-df = pd.DataFrame(raw_data)
-
-print(f"Total brut : {len(df)} articles")
-
-#  Nettoyage doublons
-df.drop_duplicates(subset=['title'], inplace=True)
-df.drop_duplicates(subset=['arxiv_identifier'], inplace=True)
-df.fillna('', inplace=True)
-
-#  Normalisation texte
-text_cols = ['title', 'abstract', 'journal_name', 'doi', 'arxiv_identifier', 'keywords', 'subject_areas', 'pdf_url']
-for col in text_cols:
-    if col in df.columns:
-        df[col] = df[col].astype(str).str.strip()
-
-nb_articles = nb_authors = nb_links = 0
-
-for _, row in df.iterrows():
-    title = row['title']
-    abstract = row['abstract']
-    journal_name = row.get('journal_name', 'ArXiv')
-    doi = row.get('doi', None)
-    arxiv_id = row['arxiv_identifier']
-    keywords = row.get('keywords', '')
-    subject_areas = row.get('subject_areas', '')
-    pdf_url = row.get('pdf_url', '')
-
-    try:
-        publication_year = int(str(row['publication_year'])[:4]) if row['publication_year'] else None
-    except:
-        publication_year = None
-
-    if not title or not arxiv_id:
-        continue
-
-    #  Insertion dans la table article
-    try:
-        cursor.execute("""
-            INSERT IGNORE INTO article
-            (title, abstract, publication_year, journal_name, doi, arxiv_identifier, keywords, subject_areas, pdf_url)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (title, abstract, publication_year, journal_name, doi, arxiv_id, keywords, subject_areas, pdf_url))
-        db.commit()
-        nb_articles += cursor.rowcount
-    except Exception as e:
-        print(f" Erreur insertion article : {e}")
-        continue
-
-    # Récupérer l'ID article
-    cursor.execute("SELECT id FROM article WHERE arxiv_identifier = %s", (arxiv_id,))
-    result = cursor.fetchone()
-    article_id = result[0] if result else None
-    if not article_id:
-        continue
-
-    #  Traitement des auteurs
-    authors_list = row.get('authors', [])
-    if not isinstance(authors_list, list):
-        continue
+#  Chemin du corpus (JSON Lines de préférence, ancien tableau JSON en repli)
+DATA_PATH = default_corpus_path()
 
+# Taille par défaut des lots pour le chargement en masse
+BATCH_SIZE = 1000
+# Nombre d'articles lus et nettoyés à la fois
+CHUNK_SIZE = 10000
+
+ARTICLE_INSERT = """
+    INSERT IGNORE INTO article
+    (title, abstract, publication_year, journal_name, doi, arxiv_identifier, keywords, subject_areas, pdf_url)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+AUTHOR_INSERT = """
+    INSERT IGNORE INTO author (full_name, arxiv_author_id, orcid, main_affiliation_id)
+    VALUES (%s, %s, %s, NULL)
+"""
+# Recherches par lot, servies par les clés `arxiv_identifier`, `full_name` et `article_id`
+ARTICLE_LOOKUP = "SELECT id, arxiv_identifier FROM article WHERE arxiv_identifier IN ({placeholders})"
+AUTHOR_LOOKUP = "SELECT id, full_name FROM author WHERE full_name IN ({placeholders}) ORDER BY id"
+LINK_LOOKUP = "SELECT author_id, article_id FROM author_article WHERE article_id IN ({placeholders})"
+LINK_INSERT = """
+    INSERT IGNORE INTO author_article (author_id, article_id)
+    VALUES (%s, %s)
+"""
+
+
+def iter_frames(path=DATA_PATH, chunk_size=CHUNK_SIZE, near_duplicates=True, threshold=0.8):
+    """Lit le corpus en flux et produit des DataFrames nettoyés de `chunk_size` articles au plus.
+
+    Les quasi-doublons (MinHash/LSH sur titre + résumé) sont écartés avant l'insertion.
+    """
+    cleaner = CorpusCleaner(NearDuplicateIndex(threshold=threshold) if near_duplicates else None)
+    for batch in iter_batches(iter_records(path), chunk_size):
+        yield cleaner.clean(pd.DataFrame(batch))
+
+    print(f"Total brut : {cleaner.rows_in} articles")
+    print(cleaner.report())
+
+
+def clean_author_names(authors_list):
     clean_authors = set()
     for author in authors_list:
         name = str(author).strip()
         if name:
             clean_authors.add(name)
+    return clean_authors
+
+
+def article_values(row):
+    return (
+        row['title'],
+        row['abstract'],
+        None if pd.isna(row['publication_year']) else int(row['publication_year']),
+        row.get('journal_name', 'ArXiv'),
+        row.get('doi', None),
+        row['arxiv_identifier'],
+        row.get('keywords', ''),
+        row.get('subject_areas', ''),
+        row.get('pdf_url', ''),
+    )
+
+
+def _as_frames(frames):
+    return [frames] if isinstance(frames, pd.DataFrame) else frames
+
+
+def insert_row_by_row(db, frames):
+    """Chargement historique : une insertion, un commit et un SELECT par ligne."""
+    cursor = db.cursor()
+    nb_articles = nb_authors = nb_links = 0
 
-    for author_name in clean_authors:
+    rows = (row for df in _as_frames(frames) for _, row in df.iterrows())
+    for row in rows:
+        title = row['title']
+        arxiv_id = row['arxiv_identifier']
+
+        if not title or not arxiv_id:
+            continue
+
+        #  Insertion dans la table article
         try:
-            cursor.execute("""
-                INSERT IGNORE INTO author (full_name, arxiv_author_id, orcid, main_affiliation_id)
-                VALUES (%s, %s, %s, NULL)
-            """, (author_name, None, None))
+            cursor.execute(ARTICLE_INSERT, article_values(row))
             db.commit()
-            nb_authors += cursor.rowcount
+            nb_articles += cursor.rowcount
         except Exception as e:
-            print(f" Erreur insertion auteur : {e}")
+            print(f" Erreur insertion article : {e}")
             continue
 
-        cursor.execute("SELECT id FROM author WHERE full_name = %s", (author_name,))
+        # Récupérer l'ID article
+        cursor.execute("SELECT id FROM article WHERE arxiv_identifier = %s", (arxiv_id,))
         result = cursor.fetchone()
-        author_id = result[0] if result else None
-        if not author_id:
+        article_id = result[0] if result else None
+        if not article_id:
             continue
 
+        #  Traitement des auteurs
+        authors_list = row.get('authors', [])
+        if not isinstance(authors_list, list):
+            continue
+
+        for author_name in clean_author_names(authors_list):
+            try:
+                cursor.execute(AUTHOR_INSERT, (author_name, None, None))
+                db.commit()
+                nb_authors += cursor.rowcount
+            except Exception as e:
+                print(f" Erreur insertion auteur : {e}")
+                continue
+
+            cursor.execute("SELECT id FROM author WHERE full_name = %s", (author_name,))
+            result = cursor.fetchone()
+            author_id = result[0] if result else None
+            if not author_id:
+                continue
+
+            try:
+                cursor.execute(LINK_INSERT, (author_id, article_id))
+                db.commit()
+                nb_links += cursor.rowcount
+            except Exception as e:
+                print(f" Erreur liaison auteur-article : {e}")
+                continue
+
+    cursor.close()
+    return nb_articles, nb_authors, nb_links
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _fetch_rows(cursor, query, keys, batch_size):
+    # Un seul SELECT ... IN (...) par lot
+    rows = []
+    for batch in _chunks(keys, batch_size):
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(query.format(placeholders=placeholders), tuple(batch))
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def _fetch_ids(cursor, query, keys, batch_size, normalize=None):
+    # Résolution des IDs par lots ; `normalize` ramène la valeur renvoyée par la base à la clé
+    # de l'appelant (la collation compare sans casse ni accents, le dictionnaire Python non)
+    ids = {}
+    for row_id, key in _fetch_rows(cursor, query, keys, batch_size):
+        ids.setdefault(normalize(key) if normalize else key, row_id)
+    return ids
+
+
+def _insert_batches(db, cursor, statement, rows, batch_size, label):
+    # executemany sur un INSERT est réécrit en INSERT multi-lignes par mysql-connector :
+    # un aller-retour et un commit par lot au lieu d'un par ligne
+    inserted = 0
+    for batch in _chunks(rows, batch_size):
         try:
-            cursor.execute("""
-                INSERT IGNORE INTO author_article (author_id, article_id)
-                VALUES (%s, %s)
-            """, (author_id, article_id))
+            cursor.executemany(statement, batch)
             db.commit()
-            nb_links += cursor.rowcount
+            inserted += cursor.rowcount
         except Exception as e:
-            print(f" Erreur liaison auteur-article : {e}")
+            db.rollback()
+            print(f" Erreur insertion {label} (lot de {len(batch)}) : {e}")
+    return inserted
+
+
+def bulk_insert(db, frames, batch_size=BATCH_SIZE):
+    """Chargement en masse : IDs résolus par lot, INSERT multi-lignes, une transaction par lot.
+
+    `frames` est un DataFrame ou un itérable de DataFrames (flux produit par iter_frames).
+    Les tables de synthèse du tableau de bord reçoivent les lignes réellement insérées ; elles
+    restent marquées périmées jusqu'à la fin du chargement (recalculées au suivant en cas d'arrêt).
+    """
+    mark_stale(db)
+    cursor = db.cursor()
+    start_time = time.perf_counter()
+
+    # Articles, auteurs et liens déjà en base résolus morceau par morceau via leurs clés :
+    # aucune table n'est chargée en entier. Les IDs d'auteurs restent en cache d'un morceau à l'autre.
+    author_ids = {}
+
+    nb_articles = nb_authors = nb_links = 0
+    delta = StatsDelta()
+    for df in _as_frames(frames):
+        counts = _bulk_insert_frame(db, cursor, df, author_ids, batch_size, delta)
+        nb_articles += counts[0]
+        nb_authors += counts[1]
+        nb_links += counts[2]
+
+    cursor.close()
+    apply_delta(db, delta)
+
+    elapsed = time.perf_counter() - start_time
+    total_rows = nb_articles + nb_authors + nb_links
+    rate = total_rows / elapsed if elapsed > 0 else 0.0
+    print(f"Chargement en masse : {total_rows} lignes en {elapsed:.2f} s ({rate:.0f} lignes/s)")
+
+    return nb_articles, nb_authors, nb_links
+
+
+def _bulk_insert_frame(db, cursor, df, author_ids, batch_size, delta):
+    # Articles valides, dans l'ordre du fichier
+    articles = {}
+    article_authors = {}
+    for row in df.to_dict('records'):
+        if not row['title'] or not row['arxiv_identifier']:
+            continue
+        arxiv_id = row['arxiv_identifier']
+        articles[arxiv_id] = article_values(row)
+        authors_list = row.get('authors', [])
+        if isinstance(authors_list, list):
+            article_authors[arxiv_id] = clean_author_names(authors_list)
+
+    # 1. Articles
+    article_ids = _fetch_ids(cursor, ARTICLE_LOOKUP, list(articles), batch_size)
+    new_articles = [values for arxiv_id, values in articles.items() if arxiv_id not in article_ids]
+    nb_articles = _insert_batches(db, cursor, ARTICLE_INSERT, new_articles, batch_size, "articles")
+    inserted = _fetch_ids(cursor, ARTICLE_LOOKUP, [values[5] for values in new_articles], batch_size)
+    article_ids.update(inserted)
+    for arxiv_id in inserted:
+        values = articles[arxiv_id]
+        delta.add_article(values[2], values[0])
+
+    # 2. Auteurs : un seul enregistrement par nom, casse et accents ignorés comme par la
+    # collation de `full_name` (author_ids est indexé par le nom normalisé)
+    unknown = {}
+    for name in sorted({name for arxiv_id, names in article_authors.items() if arxiv_id in article_ids
+                        for name in names}):
+        key = normalize_name(name)
+        if key not in author_ids:
+            unknown.setdefault(key, name)
+    author_ids.update(_fetch_ids(cursor, AUTHOR_LOOKUP, list(unknown.values()), batch_size, normalize_name))
+    new_names = [name for key, name in unknown.items() if key not in author_ids]
+    nb_authors = _insert_batches(
+        db, cursor, AUTHOR_INSERT, [(name, None, None) for name in new_names], batch_size, "auteurs"
+    )
+    new_author_ids = _fetch_ids(cursor, AUTHOR_LOOKUP, new_names, batch_size, normalize_name)
+    author_ids.update(new_author_ids)
+    for _ in new_author_ids:
+        delta.add_author()
+
+    # 3. Liens auteur-article (author_article n'a pas de clé unique : INSERT IGNORE ne suffit pas,
+    # les liens déjà présents pour les articles du morceau sont relus)
+    existing_links = set(_fetch_rows(cursor, LINK_LOOKUP, sorted(set(article_ids.values())), batch_size))
+    links = []
+    for arxiv_id, names in article_authors.items():
+        article_id = article_ids.get(arxiv_id)
+        if not article_id:
             continue
+        for name in names:
+            author_id = author_ids.get(normalize_name(name))
+            if author_id and (author_id, article_id) not in existing_links:
+                existing_links.add((author_id, article_id))
+                links.append((author_id, article_id))
+                delta.add_link(author_id, name)
+    nb_links = _insert_batches(db, cursor, LINK_INSERT, links, batch_size, "liens auteur-article")
+
+    return nb_articles, nb_authors, nb_links
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nettoyage et insertion des articles arXiv dans MySQL")
+    parser.add_argument("--data", default=DATA_PATH, help="Corpus produit par extraction.py (.jsonl, .jsonl.gz ou .json)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Nombre de lignes par lot")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Nombre d'articles lus et nettoyés à la fois")
+    parser.add_argument("--row-by-row", action="store_true", help="Utiliser l'ancien chargement ligne par ligne")
+    parser.add_argument("--keep-near-duplicates", action="store_true", help="Ne pas écarter les quasi-doublons")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=0.8, help="Similarité de Jaccard minimale")
+    args = parser.parse_args()
+
+    # Flux de DataFrames nettoyés : le corpus n'est jamais chargé en entier
+    df = iter_frames(args.data, chunk_size=args.chunk_size,
+                     near_duplicates=not args.keep_near_duplicates, threshold=args.near_duplicate_threshold)
+
+    # Connexion empruntée au pool partagé (curseurs bufferisés, vérifiée avant usage)
+    with connection() as db:
+        # Bases créées avant la clé `full_name` : les recherches d'auteurs parcouraient la table
+        ensure_full_name_index(db)
+        if args.row_by_row:
+            nb_articles, nb_authors, nb_links = insert_row_by_row(db, df)
+            # L'ancien chargement ne suit pas les insertions : recalcul complet des synthèses
+            rebuild(db)
+        else:
+            nb_articles, nb_authors, nb_links = bulk_insert(db, df, batch_size=args.batch_size)
+
+    print(f"Insertion terminée :")
+    print(f"   Articles insérés : {nb_articles}")
+    print(f"   Auteurs insérés : {nb_authors}")
+    print(f"   Liens auteur-article : {nb_links}")
 
-cursor.close()
-db.close()
 
-print(f"Insertion terminée :")
-print(f"   Articles insérés : {nb_articles}")
-print(f"   Auteurs insérés : {nb_authors}")
-print(f"   Liens auteur-article : {nb_links}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import os
+import time
+import queue
+import threading
+import mysql.connector
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+# Charger .env
+load_dotenv()
+
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_DB = os.getenv("MYSQL_DATABASE")
+
+# Connexions ouvertes au plus par processus (pool mysql-connector et pool SQLAlchemy)
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+# Attente maximale d'une connexion libre
+POOL_TIMEOUT = 30
+# Une connexion inutilisée depuis plus longtemps est vérifiée (ping) avant d'être rendue
+HEALTH_CHECK_INTERVAL = 30
+
+
+class PooledConnection:
+    """Connexion MySQL du pool, avec ses requêtes préparées.
+
+    Chaque texte SQL est préparé une fois par connexion puis ré-exécuté avec de nouveaux
+    paramètres : le serveur n'analyse plus la requête à chaque appel.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.connection_id = raw.connection_id
+        self.last_used = time.monotonic()
+        self._statements = {}
+
+    def check(self):
+        # Reconnexion transparente si le serveur a fermé la connexion (wait_timeout, redémarrage)
+        self.raw.ping(reconnect=True, attempts=3, delay=1)
+        if self.raw.connection_id != self.connection_id:
+            # Nouvelle session : les requêtes préparées de l'ancienne n'existent plus
+            self.connection_id = self.raw.connection_id
+            self._statements.clear()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        cursor = self._statements.get(sql)
+        if cursor is None:
+            cursor = self._statements[sql] = self.raw.cursor(prepared=True)
+        cursor.execute(sql, tuple(params))
+        return cursor
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        cursor = self.execute(sql, params)
+        rows = cursor.fetchall()
+        # Selon la version du connecteur, le protocole binaire peut renvoyer les textes en bytearray
+        return [
+            {name: value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value
+             for name, value in zip(cursor.column_names, row)}
+            for row in rows
+        ]
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        rows = self.query(sql, params)
+        return rows[0] if rows else None
+
+    def cursor(self, **kwargs):
+        # Curseur classique (executemany des chargements en masse)
+        kwargs.setdefault("buffered", True)
+        return self.raw.cursor(**kwargs)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        for cursor in self._statements.values():
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        self._statements.clear()
+        self.raw.close()
+
+
+class ConnectionPool:
+    """Pool borné de connexions MySQL : au plus `size` connexions, attente si toutes sont prises."""
+
+    def __init__(self, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT, **config):
+        self.size = size
+        self.timeout = timeout
+        self.config = config
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _checkout(self) -> PooledConnection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return PooledConnection(mysql.connector.connect(**self.config))
+        if time.monotonic() - conn.last_used > HEALTH_CHECK_INTERVAL:
+            conn.check()
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise mysql.connector.errors.PoolError(f"Aucune connexion libre après {self.timeout} s")
+        try:
+            conn = self._checkout()
+            broken = False
+            try:
+                yield conn
+            except mysql.connector.errors.OperationalError:
+                broken = True
+                raise
+            except Exception:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    broken = True
+                raise
+            else:
+                # Fin de la transaction implicite (autocommit désactivé) : sinon la connexion
+                # inactive garde son instantané InnoDB et ses verrous de métadonnées
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    broken = True
+            finally:
+                if broken:
+                    conn.close()
+                else:
+                    conn.last_used = time.monotonic()
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def health_check(self) -> bool:
+        try:
+            with self.connection() as conn:
+                conn.check()
+                return conn.query_one("SELECT 1 AS ok")["ok"] == 1
+        except mysql.connector.Error:
+            return False
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool = None
+_engine = None
+_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Pool partagé par tout le processus, créé au premier appel."""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ConnectionPool(host=MYSQL_HOST, user=MYSQL_USER, password=MYSQL_PASSWORD, database=MYSQL_DB)
+    return _pool
+
+
+def connection():
+    """`with connection() as conn:` emprunte une connexion du pool partagé."""
+    return get_pool().connection()
+
+
+def get_engine():
+    """Moteur SQLAlchemy partagé : pool borné, connexions vérifiées avant usage."""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = create_engine(
+                    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}",
+                    pool_size=POOL_SIZE, max_overflow=0, pool_timeout=POOL_TIMEOUT,
+                    pool_pre_ping=True, pool_recycle=3600,
+                )
+    return _engine
@@ -0,0 +1,145 @@
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+
+from typing import Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "models/embedding_cache"
+
+# Limite de variables d'une requête SQLite
+SQLITE_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Cache disque des embeddings, indexé par (nom du modèle, hash du texte).
+
+    Les vecteurs sont ajoutés à la fin d'une matrice float32 brute lue par memory-map ;
+    la table hash -> ligne est stockée dans SQLite. Une ligne n'est publiée dans la table
+    qu'après l'écriture complète de son vecteur, et les écritures sont sérialisées par
+    une transaction IMMEDIATE : le builder hors ligne et l'application Streamlit peuvent
+    partager les mêmes fichiers.
+    """
+
+    def __init__(self, model_name: str, directory: str = CACHE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        safe_name = re.sub(r"[^\w.-]", "_", model_name)
+        self.model_name = model_name
+        self.vectors_path = os.path.join(directory, f"{safe_name}.f32")
+        self.db_path = os.path.join(directory, f"{safe_name}.sqlite")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        if not os.path.exists(self.vectors_path):
+            open(self.vectors_path, "ab").close()
+
+        self.dim = self._read_dim()
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+
+    def _read_dim(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _lookup(self, hashes: Iterable[str]) -> Dict[str, int]:
+        hashes = list(hashes)
+        rows = {}
+        for start in range(0, len(hashes), SQLITE_BATCH):
+            batch = hashes[start:start + SQLITE_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows.update(self._conn.execute(
+                f"SELECT hash, row FROM embeddings WHERE hash IN ({placeholders})", batch
+            ).fetchall())
+        return rows
+
+    def _vectors(self, max_row: int) -> np.ndarray:
+        # Re-mapper le fichier si un autre processus l'a agrandi depuis
+        if self._matrix is None or max_row >= self._matrix.shape[0]:
+            rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            self._matrix = np.memmap(self.vectors_path, dtype="float32", mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    def _append(self, hashes: List[str], embeddings: np.ndarray) -> Dict[str, int]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            dim = self._read_dim()
+            if dim is None:
+                dim = embeddings.shape[1]
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('model_name', ?)", (self.model_name,))
+            elif dim != embeddings.shape[1]:
+                raise ValueError(f"Dimension incompatible avec le cache : {embeddings.shape[1]} au lieu de {dim}")
+            self.dim = dim
+
+            # Un autre processus a pu encoder les mêmes textes entre-temps
+            rows = self._lookup(hashes)
+            keep = [i for i, h in enumerate(hashes) if h not in rows]
+
+            if keep:
+                row_bytes = dim * 4
+                size = os.path.getsize(self.vectors_path)
+                start = size // row_bytes
+                with open(self.vectors_path, "r+b") as f:
+                    if size % row_bytes:
+                        # Écarter une écriture partielle laissée par un arrêt brutal
+                        f.truncate(start * row_bytes)
+                    f.seek(start * row_bytes)
+                    f.write(np.ascontiguousarray(embeddings[keep], dtype="float32").tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                new_rows = {hashes[i]: start + offset for offset, i in enumerate(keep)}
+                self._conn.executemany("INSERT INTO embeddings (hash, row) VALUES (?, ?)", new_rows.items())
+                rows.update(new_rows)
+
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Retourne les embeddings de `texts` ; seuls les textes absents du cache passent par `encode_fn`."""
+        hashes = [text_hash(t) for t in texts]
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = self._read_dim()
+            rows = self._lookup(set(hashes)) if self.dim is not None else {}
+
+            missing = {}
+            for h, t in zip(hashes, texts):
+                if h not in rows and h not in missing:
+                    missing[h] = t
+
+            self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+            self.misses += len(missing)
+
+            if missing:
+                logger.info(f"Cache d'embeddings : {len(missing)} textes à encoder, {len(rows)} déjà en cache.")
+                embeddings = np.asarray(encode_fn(list(missing.values())), dtype="float32")
+                rows.update(self._append(list(missing.keys()), embeddings))
+
+            if not hashes:
+                return np.zeros((0, self.dim or 0), dtype="float32")
+
+            order = [rows[h] for h in hashes]
+            return np.array(self._vectors(max(order))[order], dtype="float32")
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
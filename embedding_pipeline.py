@@ -0,0 +1,141 @@
+import os
+import time
+import logging
+import numpy as np
+import torch
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+# Taille des lots envoyés au modèle
+BATCH_SIZE = 64
+# En dessous de ce nombre de textes, le démarrage du pool coûte plus qu'il ne rapporte
+MIN_PARALLEL_TEXTS = 1000
+# Textes tokenisés à la fois pour le comptage des tokens du pool
+COUNT_BATCH_SIZE = 1024
+
+
+class EmbeddingPipeline:
+    """Encodage par lots, réparti sur un pool de processus CPU sentence-transformers.
+
+    `model` est un SentenceTransformer ou un encodeur de même interface (encoders.OnnxEncoder).
+    Le pool est démarré au premier gros appel puis réutilisé pour tous les morceaux
+    suivants ; chaque processus charge sa propre copie du modèle et limite torch à
+    `threads` threads pour que le total ne dépasse pas le nombre de cœurs.
+
+    En local, `encode` du modèle trie déjà les textes par longueur : chaque lot regroupe des
+    résumés de longueur voisine et le remplissage (padding) est minimal. Pour le pool, les
+    textes sont triés avec la même clé (nombre de caractères, sans tokenisation) avant d'être
+    découpés entre les processus. Les embeddings sont renvoyés dans l'ordre d'origine.
+    """
+
+    def __init__(self, model, batch_size: int = BATCH_SIZE,
+                 processes: Optional[int] = None, threads: Optional[int] = None,
+                 chunk_size: Optional[int] = None, max_seq_length: Optional[int] = None):
+        cores = os.cpu_count() or 1
+        self.model = model
+        if max_seq_length:
+            # Tokens au-delà de cette limite tronqués (à fixer avant le démarrage du pool)
+            self.model.max_seq_length = max_seq_length
+        self.batch_size = batch_size
+        self.processes = max(1, processes or cores)
+        self.threads = max(1, threads or cores // self.processes)
+        # Textes envoyés à un processus à la fois (None : réparti automatiquement)
+        self.chunk_size = chunk_size
+        self._pool = None
+        self.texts = 0
+        self.tokens = 0
+        self.seconds = 0.0
+        # Durée des encodages dont les tokens sont comptés
+        self.token_seconds = 0.0
+
+    def _start_pool(self):
+        # Les processus fils lisent ces variables à l'import de torch
+        previous = {name: os.environ.get(name) for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS")}
+        os.environ.update({name: str(self.threads) for name in previous})
+        try:
+            logger.info(f"Démarrage de {self.processes} processus d'encodage ({self.threads} threads chacun)...")
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def _count_tokens(self, texts: List[str]) -> int:
+        # Même décompte que la tokenisation des processus fils (troncature à max_seq_length, tokens spéciaux)
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return 0
+        max_length = getattr(self.model, "max_seq_length", None)
+        tokens = 0
+        for start in range(0, len(texts), COUNT_BATCH_SIZE):
+            encoded = tokenizer(texts[start:start + COUNT_BATCH_SIZE], truncation=max_length is not None,
+                                max_length=max_length)
+            tokens += sum(len(ids) for ids in encoded["input_ids"])
+        return tokens
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype="float32")
+
+        start = time.perf_counter()
+        # Tokens comptés par l'encodeur lors de sa propre tokenisation (encoders.SentenceEncoder, OnnxEncoder)
+        tokens_before = getattr(self.model, "tokens", None)
+
+        # Pool multi-processus propre à sentence-transformers ; ONNX Runtime gère ses threads
+        parallel = hasattr(self.model, "start_multi_process_pool")
+        if parallel and self.processes > 1 and len(texts) >= MIN_PARALLEL_TEXTS:
+            if self._pool is None:
+                self._start_pool()
+            # encode_multi_process découpe la liste dans l'ordre reçu : tri préalable par longueur
+            # (clé de SentenceTransformer.encode) pour des morceaux homogènes, puis ordre d'origine
+            order = np.argsort([-len(text) for text in texts], kind="stable")
+            # Tokenisation faite dans les processus fils : les tokens sont recomptés ici, par le
+            # tokenizer rapide (hors GIL), pendant que le pool encode
+            with ThreadPoolExecutor(max_workers=1) as counter:
+                counted = counter.submit(self._count_tokens, texts)
+                embeddings = self.model.encode_multi_process(
+                    [texts[i] for i in order], self._pool, batch_size=self.batch_size, chunk_size=self.chunk_size
+                )
+                tokens = counted.result()
+            restored = np.empty_like(np.asarray(embeddings, dtype="float32"))
+            restored[order] = embeddings
+        else:
+            torch.set_num_threads(self.threads * self.processes)
+            restored = np.asarray(self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True),
+                                  dtype="float32")
+            tokens = self.model.tokens - tokens_before if tokens_before is not None else 0
+
+        elapsed = time.perf_counter() - start
+        self.texts += len(texts)
+        self.seconds += elapsed
+        if tokens:
+            self.tokens += tokens
+            self.token_seconds += elapsed
+        rate = f"{len(texts) / max(elapsed, 1e-9):.0f} textes/s"
+        if tokens:
+            rate += f", {tokens / max(elapsed, 1e-9):.0f} tokens/s"
+        logger.info(f"{len(texts)} textes encodés en {elapsed:.1f} s ({rate})")
+        return restored
+
+    def throughput(self) -> float:
+        return self.texts / self.seconds if self.seconds > 0 else 0.0
+
+    def token_throughput(self) -> float:
+        return self.tokens / self.token_seconds if self.token_seconds > 0 else 0.0
+
+    def close(self):
+        if self._pool is not None:
+            SentenceTransformer.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Union
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+# Dossier du cache Hugging Face local (snapshot du modèle)
+MODELS_DIR = "models"
+ONNX_DIR = "models/onnx"
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+# Backend par défaut du moteur de recherche et du builder
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+
+SAMPLE_QUERIES = [
+    "deep learning in medicine",
+    "graph neural networks for molecules",
+    "reinforcement learning for robotics",
+    "medical image segmentation",
+    "large language models evaluation",
+    "bayesian optimization of hyperparameters",
+    "federated learning privacy",
+    "time series forecasting with transformers",
+]
+
+
+def onnx_directory(model_name: str, directory: str = ONNX_DIR) -> str:
+    return os.path.join(directory, re.sub(r"[^\w.-]", "_", model_name))
+
+
+def export_onnx(model_name: str, directory: str = ONNX_DIR, quantize: bool = True) -> str:
+    """Exporte le transformer du modèle local en ONNX (float32, puis int8 dynamique si `quantize`)."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model = SentenceTransformer(model_name, cache_folder=MODELS_DIR)
+    transformer, pooling = model[0], model[1]
+    if not pooling.get_config_dict().get("pooling_mode_mean_tokens"):
+        raise ValueError(f"Export ONNX : seul le pooling moyen est pris en charge ({model_name})")
+
+    target = onnx_directory(model_name, directory)
+    os.makedirs(target, exist_ok=True)
+    fp32_path = os.path.join(target, "model.onnx")
+
+    # Entrées dans l'ordre de forward() : input_ids, attention_mask, token_type_ids
+    dummy = transformer.tokenizer(["exemple de résumé"], return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    auto_model = transformer.auto_model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model, tuple(dummy[name] for name in names), fp32_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]},
+            opset_version=14,
+        )
+    logger.info(f"Modèle ONNX exporté : {fp32_path}")
+
+    if quantize:
+        int8_path = os.path.join(target, "model-int8.onnx")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        logger.info(f"Modèle ONNX quantifié (int8 dynamique) : {int8_path}")
+
+    transformer.tokenizer.save_pretrained(target)
+    with open(os.path.join(target, "encoder.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": model.max_seq_length,
+            "dim": model.get_sentence_embedding_dimension(),
+            # all-MiniLM-L6-v2 se termine par un module Normalize
+            "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        }, f, indent=4)
+    return target
+
+
+class SentenceEncoder(SentenceTransformer):
+    """SentenceTransformer qui compte les tokens de sa propre tokenisation (débit en tokens/s)."""
+
+    tokens = 0
+
+    def tokenize(self, texts):
+        features = super().tokenize(texts)
+        self.tokens += int(features["attention_mask"].sum())
+        return features
+
+
+class OnnxEncoder:
+    """Encodeur ONNX Runtime (CPU) exposant la même interface que SentenceTransformer.encode.
+
+    Pooling moyen sur le masque d'attention puis normalisation L2, comme les modules
+    Pooling et Normalize du modèle d'origine. Comme SentenceTransformer.encode, les textes
+    sont encodés du plus long au plus court pour limiter le remplissage des lots.
+    """
+
+    tokens = 0
+
+    def __init__(self, model_name: str, quantized: bool = True, directory: str = ONNX_DIR,
+                 threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        target = onnx_directory(model_name, directory)
+        model_path = os.path.join(target, "model-int8.onnx" if quantized else "model.onnx")
+        if not os.path.exists(model_path):
+            export_onnx(model_name, directory, quantize=quantized)
+        with open(os.path.join(target, "encoder.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(target)
+        self.max_seq_length = config["max_seq_length"]
+        self.normalize = config["normalize"]
+        self.dim = config["dim"]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype="float32")
+
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer([texts[i] for i in order[start:start + batch_size]], padding=True,
+                                    truncation=True, max_length=self.max_seq_length, return_tensors="np")
+            self.tokens += int(tokens["attention_mask"].sum())
+            feed = {name: tokens[name].astype("int64") for name in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feed)[0]
+
+            mask = tokens["attention_mask"][..., None].astype("float32")
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype("float32"))
+
+        embeddings = np.empty((len(texts), self.dim), dtype="float32")
+        embeddings[order] = np.vstack(chunks)
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(model_name: str = "all-MiniLM-L6-v2", backend: str = ENCODER_BACKEND,
+                 threads: Optional[int] = None):
+    if backend == "torch":
+        return SentenceEncoder(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEncoder(model_name, quantized=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Backend d'encodage inconnu : {backend} (attendu : {', '.join(ENCODER_BACKENDS)})")
+
+
+def cache_name(model_name: str, backend: str) -> str:
+    # Vecteurs de backends différents jamais mélangés dans le cache d'embeddings
+    return model_name if backend == "torch" else f"{model_name}-{backend}"
+
+
+def query_latency(encoder, queries: List[str], repeats: int = 5) -> Dict[str, float]:
+    """Latence d'encodage d'une requête seule (p50 / p99, en ms)."""
+    encoder.encode(queries[:1])  # chauffe
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            encoder.encode([query])
+            timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+
+def drift_report(model_name: str = "all-MiniLM-L6-v2", backend: str = "onnx-int8",
+                 texts: Optional[List[str]] = None, k: int = 10) -> Dict[str, Any]:
+    """Écart entre les embeddings PyTorch et ceux de `backend` : cosinus par texte, recouvrement des top-k, latence."""
+    texts = texts or SAMPLE_QUERIES
+    reference = load_encoder(model_name, "torch")
+    candidate = load_encoder(model_name, backend)
+
+    expected = reference.encode(texts, convert_to_numpy=True).astype("float32")
+    found = candidate.encode(texts).astype("float32")
+    cosine = (expected * found).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(found, axis=1)
+    )
+
+    # Les voisins de chaque texte parmi les autres sont-ils les mêmes ?
+    k = min(k, len(texts) - 1)
+    overlap = 1.0
+    if k > 0:
+        top_expected = np.argsort(-(expected @ expected.T), axis=1)[:, 1:k + 1]
+        top_found = np.argsort(-(found @ found.T), axis=1)[:, 1:k + 1]
+        overlap = float(np.mean([len(set(e) & set(f)) / k for e, f in zip(top_expected, top_found)]))
+
+    report = {
+        "backend": backend,
+        "texts": len(texts),
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        f"top{k}_overlap": overlap,
+        "torch": query_latency(reference, SAMPLE_QUERIES),
+        backend: query_latency(candidate, SAMPLE_QUERIES),
+    }
+    logger.info(f"Rapport de dérive : {report}")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export ONNX de l'encodeur et contrôle de dérive")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Modèle sentence-transformers")
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS[1:], default="onnx-int8", help="Backend à comparer à PyTorch")
+    parser.add_argument("--export", action="store_true", help="(Ré)exporter le modèle ONNX avant le contrôle")
+    parser.add_argument("--sample", type=int, default=500, help="Nombre de résumés du MetadataStore utilisés")
+    args = parser.parse_args()
+
+    if args.export:
+        export_onnx(args.model, quantize=args.backend == "onnx-int8")
+
+    from metadata_store import METADATA_DIR, MetadataStore
+    texts = None
+    if MetadataStore.exists(METADATA_DIR):
+        store = MetadataStore(METADATA_DIR)
+        texts = [store.get(i, "abstract") for i in range(min(args.sample, len(store)))]
+
+    report = drift_report(args.model, args.backend, texts)
+    print(f"\nDérive {args.backend} / torch sur {report['texts']} textes :")
+    print(f"   Cosinus moyen : {report['mean_cosine']:.4f} (min {report['min_cosine']:.4f})")
+    for key, value in report.items():
+        if key.startswith("top"):
+            print(f"   Recouvrement {key[3:]} : {value:.3f}")
+    for name in ("torch", args.backend):
+        print(f"   Latence requête {name} : p50 {report[name]['p50_ms']:.2f} ms, p99 {report[name]['p99_ms']:.2f} ms")
@@ -1,13 +1,25 @@
 import os
 import json
 import time
+import argparse
+import threading
 import feedparser
 import requests
+import pandas as pd
 
-# Dossier de sauvegarde le data
-DATA_PATH = "data/arxiv_data.json"
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from corpus import CORPUS_PATH, iter_batches, iter_records, open_corpus
+from cleaning import CorpusCleaner
+
+# Dossier de sauvegarde le data : corpus JSON Lines (.jsonl ou .jsonl.gz) complété au fil de l'eau
+DATA_PATH = CORPUS_PATH
+# Points de reprise par requête
+CHECKPOINT_PATH = "data/harvest_checkpoint.json"
 os.makedirs("data", exist_ok=True)
 
+# URL de l'API (surchargeable pour tester contre un faux serveur Atom local)
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+
 #  Liste des domaines à rechercher
 QUERIES = [
     "machine learning",
@@ -19,85 +31,231 @@ QUERIES = [
     "data science"
 ]
 
-def search_arxiv(query, max_results=100):
-    articles = []
-    base_url = "http://export.arxiv.org/api/query"
-    start = 0
-    count_per_page = 100
+COUNT_PER_PAGE = 100
+
+
+class RateLimiter:
+    """Espacement minimal entre deux requêtes, partagé par tous les threads.
+
+    `clock` et `sleep` sont remplaçables (horloge simulée dans les tests).
+    """
+
+    def __init__(self, min_interval=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = self.clock()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if delay > 0:
+            self.sleep(delay)
+
+
+class Checkpoint:
+    """Prochain offset à extraire pour chaque requête, réécrit de façon atomique."""
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def get(self, query):
+        return self.state.get(query, {"start": 0})
+
+    def update(self, query, start):
+        with self._lock:
+            self.state[query] = {"start": start}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.path)
+
+
+class RecordWriter:
+    """Écrit les articles en JSON Lines dès leur réception, nettoyés et sans doublon."""
+
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.cleaner = CorpusCleaner()
+        if os.path.exists(path):
+            # Reprise : les articles déjà écrits alimentent le dédoublonnage
+            for batch in iter_batches(iter_records(path), 10000):
+                self.cleaner.clean(pd.DataFrame(batch))
+        self._file = open_corpus(path, "a")
+
+    def write(self, articles):
+        if not articles:
+            return 0
+        with self._lock:
+            # canonical_id sert au dédoublonnage seulement : pas de champ en plus dans le corpus
+            cleaned = self.cleaner.clean(pd.DataFrame(articles)).drop(columns=["canonical_id"], errors="ignore")
+            records = CorpusCleaner.to_records(cleaned)
+            for article in records:
+                self._file.write(json.dumps(article, ensure_ascii=False) + "\n")
+            self._file.flush()
+        return len(records)
+
+    def close(self):
+        self._file.close()
+
+
+# Une session HTTP par thread : connexions keep-alive réutilisées entre les pages
+_local = threading.local()
+
+
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
 
-    while start < max_results:
-        params = {
-            "search_query": f'all:"{query}"',
-            "start": start,
-            "max_results": count_per_page
-        }
 
-        print(f" Extraction : {query} (résultats {start + 1} à {start + count_per_page})")
+def parse_entry(entry):
+    title = entry.title.strip().replace("\n", " ")
+    summary = entry.summary.strip().replace("\n", " ")
+    published = entry.published[:10] if 'published' in entry else ""
+    publication_year = published[:4] if published else None
+    authors = [author.name for author in entry.authors] if 'authors' in entry else []
+    categories = [tag['term'] for tag in entry.tags] if 'tags' in entry else []
+    article_id = entry.id
 
+    # Lien PDF
+    pdf_url = None
+    for link in entry.get("links", []):
+        if link.get("type") == "application/pdf":
+            pdf_url = link.href
+            break
+
+    return {
+        "title": title,
+        "abstract": summary,
+        "publication_year": publication_year,
+        "journal_name": "ArXiv",
+        "doi": None,
+        "arxiv_identifier": article_id,
+        "keywords": ", ".join(categories),
+        "subject_areas": ", ".join(categories),
+        "authors": authors,
+        "pdf_url": pdf_url
+    }
+
+
+def fetch_page(query, start, count=COUNT_PER_PAGE, base_url=None, rate_limiter=None, retries=3, backoff=2.0):
+    params = {
+        "search_query": f'all:"{query}"',
+        "start": start,
+        "max_results": count
+    }
+
+    for attempt in range(retries + 1):
+        if rate_limiter:
+            rate_limiter.wait()
         try:
-            response = requests.get(base_url, params=params, timeout=10)
+            response = _session().get(base_url or ARXIV_API_URL, params=params, timeout=10)
             response.raise_for_status()
-            feed = feedparser.parse(response.content)
-
-            if not feed.entries:
-                break
-
-            for entry in feed.entries:
-                title = entry.title.strip().replace("\n", " ")
-                summary = entry.summary.strip().replace("\n", " ")
-                published = entry.published[:10] if 'published' in entry else ""
-                publication_year = published[:4] if published else None
-                authors = [author.name for author in entry.authors] if 'authors' in entry else []
-                categories = [tag['term'] for tag in entry.tags] if 'tags' in entry else []
-                article_id = entry.id
-
-                # Lien PDF
-                pdf_url = None
-                for link in entry.links:
-                    if link.type == "application/pdf":
-                        pdf_url = link.href
-                        break
-
-                article = {
-                    "title": title,
-                    "abstract": summary,
-                    "publication_year": publication_year,
-                    "journal_name": "ArXiv",
-                    "doi": None,
-                    "arxiv_identifier": article_id,
-                    "keywords": ", ".join(categories),
-                    "subject_areas": ", ".join(categories),
-                    "authors": authors,
-                    "pdf_url": pdf_url
-                }
-
-                articles.append(article)
-
-            start += count_per_page
-            time.sleep(1)
+            return [parse_entry(entry) for entry in feedparser.parse(response.content).entries]
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            print(f"Erreur pour '{query}' (offset {start}) : {e} — nouvel essai dans {delay:.0f} s")
+            time.sleep(delay)
+
 
+def search_arxiv(query, max_results=100, base_url=None, rate_limiter=None):
+    articles = []
+    start = 0
+    # Un seul limiteur pour toute la requête : une pause entre deux pages
+    rate_limiter = rate_limiter or RateLimiter()
+
+    while start < max_results:
+        print(f" Extraction : {query} (résultats {start + 1} à {start + COUNT_PER_PAGE})")
+        try:
+            page = fetch_page(query, start, base_url=base_url, rate_limiter=rate_limiter)
         except Exception as e:
             print(f"Erreur pour '{query}': {e}")
             break
+        if not page:
+            break
+        articles.extend(page)
+        start += COUNT_PER_PAGE
 
     return articles
 
-if __name__ == "__main__":
-    all_articles = []
 
-    for query in QUERIES:
-        extracted = search_arxiv(query, max_results=100)
-        all_articles.extend(extracted)
+def harvest_query(query, max_results, writer, checkpoint, rate_limiter, base_url=None):
+    state = checkpoint.get(query)
+    start = state["start"]
+    written = 0
+
+    # Reprise à l'offset enregistré : seules les pages au-delà sont demandées, tant que
+    # `max_results` le dépasse (limite relevée, ou flux épuisé au passage précédent)
+    while start < max_results:
+        print(f" Extraction : {query} (résultats {start + 1} à {start + COUNT_PER_PAGE})")
+        page = fetch_page(query, start, base_url=base_url, rate_limiter=rate_limiter)
+        if not page:
+            break
+        # Articles écrits avant le point de reprise : un arrêt ne perd au plus qu'une page
+        written += writer.write(page)
+        start += COUNT_PER_PAGE
+        checkpoint.update(query, start)
+
+    return written
+
+
+def harvest(queries=QUERIES, max_results=100, workers=4, min_interval=1.0, base_url=None,
+            output_path=DATA_PATH, checkpoint_path=CHECKPOINT_PATH):
+    """Extraction concurrente et reprenable : les requêtes tournent en parallèle sous un débit commun."""
+    checkpoint = Checkpoint(checkpoint_path)
+    writer = RecordWriter(output_path)
+    rate_limiter = RateLimiter(min_interval)
+    total = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(harvest_query, query, max_results, writer, checkpoint, rate_limiter, base_url): query
+                for query in queries
+            }
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    count = future.result()
+                    total += count
+                    print(f" '{query}' : {count} nouveaux articles")
+                except Exception as e:
+                    print(f"Erreur pour '{query}': {e} (reprise possible au prochain lancement)")
+    finally:
+        writer.close()
+        print(writer.cleaner.report())
+
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extraction des articles arXiv")
+    parser.add_argument("--max-results", type=int, default=100, help="Nombre maximal d'articles par requête")
+    parser.add_argument("--workers", type=int, default=4, help="Nombre de requêtes extraites en parallèle")
+    parser.add_argument("--min-interval", type=float, default=1.0, help="Secondes minimum entre deux appels à l'API")
+    parser.add_argument("--base-url", default=ARXIV_API_URL, help="URL de l'API Atom")
+    parser.add_argument("--output", default=DATA_PATH, help="Corpus JSON Lines (.jsonl ou .jsonl.gz)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignorer les points de reprise (le corpus existant est conservé et sert au dédoublonnage)")
+    args = parser.parse_args()
 
-    #  Supprimer les doublons (par ID arXiv)
-    seen_ids = set()
-    unique_articles = []
-    for art in all_articles:
-        if art["arxiv_identifier"] not in seen_ids:
-            unique_articles.append(art)
-            seen_ids.add(art["arxiv_identifier"])
+    if args.fresh and os.path.exists(CHECKPOINT_PATH):
+        # RecordWriter écarte les articles déjà présents dans le corpus : il n'y a pas à l'effacer
+        os.remove(CHECKPOINT_PATH)
 
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(unique_articles, f, ensure_ascii=False, indent=4)
+    added = harvest(QUERIES, max_results=args.max_results, workers=args.workers,
+                    min_interval=args.min_interval, base_url=args.base_url, output_path=args.output)
 
-    print(f"\n Total final : {len(unique_articles)} articles enregistrés dans '{DATA_PATH}'")
+    print(f"\n Total final : {added} nouveaux articles ajoutés à '{args.output}'")
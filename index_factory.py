@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import logging
+import faiss
+import numpy as np
+
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+METRICS = ("l2", "ip")
+
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "index_type": "flat",
+    "metric": "l2",         # "ip" : embeddings normalisés, score = similarité cosinus
+    "nlist": None,          # IVF : nombre de listes (None = 4 * sqrt(n))
+    "pq_m": 16,             # IVF-PQ : nombre de sous-quantificateurs
+    "pq_nbits": 8,          # IVF-PQ : bits par sous-quantificateur
+    "hnsw_m": 32,           # HNSW : voisins par nœud
+    "ef_construction": 200,
+    "train_size": 100000,   # taille max de l'échantillon d'entraînement
+    "nprobe": 16,           # IVF : listes visitées à la requête
+    "ef_search": 64,        # HNSW : largeur de recherche à la requête
+}
+# Paramètres lus à la requête : modifiables sans reconstruire l'index
+QUERY_PARAMS = ("nprobe", "ef_search")
+
+# Filtre plus sélectif : recherche exacte sur les seuls vecteurs retenus (IVF et HNSW)
+EXACT_SEARCH_MAX = 4096
+# Au-delà : nprobe / efSearch relevés pour rencontrer environ FILTER_OVERSAMPLE * k vecteurs retenus
+FILTER_OVERSAMPLE = 4
+
+
+def same_build(params: Dict[str, Any], other: Dict[str, Any]) -> bool:
+    """Vrai si les deux jeux de paramètres produisent le même index (hors paramètres de requête)."""
+    return all(params.get(key) == other.get(key) for key in DEFAULT_PARAMS if key not in QUERY_PARAMS)
+
+
+def params_path(index_path: str) -> str:
+    return index_path + ".json"
+
+
+def load_params(index_path: str) -> Dict[str, Any]:
+    params = dict(DEFAULT_PARAMS)
+    path = params_path(index_path)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            params.update(json.load(f))
+    return params
+
+
+def save_params(index_path: str, params: Dict[str, Any]):
+    # Écriture à côté puis renommage : un lecteur ne voit jamais un fichier à moitié écrit
+    path = params_path(index_path)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+
+def _nlist(params: Dict[str, Any], n: int) -> int:
+    nlist = params.get("nlist") or int(4 * np.sqrt(n))
+    return max(1, min(nlist, n))
+
+
+def prepare_vectors(embeddings: np.ndarray, params: Dict[str, Any]) -> np.ndarray:
+    """Vecteurs prêts pour l'index : float32 contigus, normalisés L2 en mode "ip"."""
+    vectors = np.array(embeddings, dtype="float32", order="C")
+    if params.get("metric", "l2") == "ip":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def similarity_scores(distances: np.ndarray, params: Dict[str, Any]) -> np.ndarray:
+    """Scores de similarité, décroissants dans l'ordre renvoyé par FAISS."""
+    if params.get("metric", "l2") == "ip":
+        # Produit scalaire de vecteurs normalisés = similarité cosinus
+        return distances
+    return np.maximum(0, 1 - distances / 4)
+
+
+def build_index(embeddings: np.ndarray, params: Dict[str, Any]) -> faiss.Index:
+    """Construit (et entraîne si besoin) l'index décrit par `params`."""
+    index_type = params.get("index_type", "flat")
+    metric = params.get("metric", "l2")
+    if metric not in METRICS:
+        raise ValueError(f"Métrique inconnue : {metric} (attendu : {', '.join(METRICS)})")
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+    embeddings = prepare_vectors(embeddings, params)
+    n, dim = embeddings.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+    elif index_type == "ivf_flat":
+        params["nlist"] = _nlist(params, n)
+        index = faiss.IndexIVFFlat(faiss.IndexFlat(dim, faiss_metric), dim, params["nlist"], faiss_metric)
+    elif index_type == "ivf_pq":
+        if dim % params["pq_m"]:
+            raise ValueError(f"pq_m={params['pq_m']} doit diviser la dimension {dim}")
+        params["nlist"] = _nlist(params, n)
+        index = faiss.IndexIVFPQ(faiss.IndexFlat(dim, faiss_metric), dim, params["nlist"],
+                                 params["pq_m"], params["pq_nbits"], faiss_metric)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["hnsw_m"], faiss_metric)
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        raise ValueError(f"Type d'index inconnu : {index_type} (attendu : {', '.join(INDEX_TYPES)})")
+
+    if not index.is_trained:
+        train_size = min(params["train_size"], n)
+        sample = embeddings[np.random.default_rng(0).choice(n, train_size, replace=False)]
+        logger.info(f"Entraînement de l'index {index_type} sur {train_size} vecteurs...")
+        index.train(sample)
+
+    index.add(embeddings)
+    return index
+
+
+def search_parameters(index: faiss.Index, params: Dict[str, Any],
+                      nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                      selection: Optional[np.ndarray] = None, k: int = 10):
+    """Paramètres de recherche par requête (thread-safe, l'index partagé n'est pas modifié).
+
+    `selection` restreint la recherche à ces positions (filtres appliqués pendant la recherche).
+    IVF et HNSW n'explorent qu'une partie de l'index : plus le filtre est sélectif, plus
+    nprobe / efSearch sont relevés pour que les k résultats restent trouvés.
+    """
+    extra = {}
+    wanted = 0
+    if selection is not None:
+        extra["sel"] = faiss.IDSelectorBatch(np.ascontiguousarray(selection, dtype="int64"))
+        # Vecteurs à parcourir pour croiser FILTER_OVERSAMPLE * k vecteurs retenus
+        wanted = int(np.ceil(FILTER_OVERSAMPLE * k * index.ntotal / max(len(selection), 1)))
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = nprobe or params["nprobe"]
+        if wanted:
+            nprobe = min(ivf.nlist, max(nprobe, int(np.ceil(wanted * ivf.nlist / max(index.ntotal, 1)))))
+        return faiss.SearchParametersIVF(nprobe=nprobe, **extra)
+    if isinstance(index, faiss.IndexHNSW):
+        ef_search = ef_search or params["ef_search"]
+        if wanted:
+            ef_search = min(index.ntotal, max(ef_search, wanted))
+        return faiss.SearchParametersHNSW(efSearch=ef_search, **extra)
+    return faiss.SearchParameters(**extra) if extra else None
+
+
+def enable_reconstruct(index: faiss.Index):
+    """Table position -> vecteur des index IVF, nécessaire à la recherche exacte filtrée."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+
+
+def _exact_search(index: faiss.Index, params: Dict[str, Any], queries: np.ndarray, k: int,
+                  selection: np.ndarray):
+    # Distances calculées sur les vecteurs retenus, au format de index.search (L2 au carré)
+    selection = np.ascontiguousarray(selection, dtype="int64")
+    vectors = index.reconstruct_batch(selection)
+    ip = params.get("metric", "l2") == "ip"
+    if ip:
+        distances = queries @ vectors.T
+    else:
+        distances = (np.sum(queries ** 2, axis=1)[:, None] + np.sum(vectors ** 2, axis=1)[None, :]
+                     - 2 * queries @ vectors.T)
+    order = np.argsort(-distances if ip else distances, axis=1, kind="stable")[:, :k]
+
+    found = np.full((len(queries), k), -1, dtype="int64")
+    out = np.full((len(queries), k), -np.inf if ip else np.inf, dtype="float32")
+    found[:, :order.shape[1]] = selection[order]
+    out[:, :order.shape[1]] = np.take_along_axis(distances, order, axis=1)
+    return out, found
+
+
+def search_index(index: faiss.Index, params: Dict[str, Any], queries: np.ndarray, k: int,
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                 selection: Optional[np.ndarray] = None):
+    """Comme index.search, restreint à `selection` sans perdre de résultats quand le filtre est sélectif."""
+    approximate = not isinstance(index, faiss.IndexFlat)
+    if selection is not None and approximate and len(selection) <= EXACT_SEARCH_MAX:
+        enable_reconstruct(index)
+        return _exact_search(index, params, queries, k, selection)
+    return index.search(queries, k, params=search_parameters(index, params, nprobe, ef_search, selection, k))
+
+
+def recall_report(embeddings: np.ndarray, params: Dict[str, Any], k: int = 10, n_queries: int = 200) -> Dict[str, float]:
+    """Recall@k et latence moyenne de l'index `params` par rapport à l'index exact de même métrique."""
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(len(embeddings), min(n_queries, len(embeddings)), replace=False)]
+    queries = prepare_vectors(queries, params)
+
+    flat = build_index(embeddings, {**params, "index_type": "flat"})
+    start = time.perf_counter()
+    _, expected = flat.search(queries, k)
+    flat_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    index = build_index(embeddings, dict(params))
+    search_params = search_parameters(index, params)
+    start = time.perf_counter()
+    _, found = index.search(queries, k, params=search_params)
+    index_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    hits = sum(len(set(e) & set(f)) for e, f in zip(expected, found))
+    report = {
+        "index_type": params["index_type"],
+        "metric": params.get("metric", "l2"),
+        f"recall@{k}": hits / (k * len(queries)),
+        "flat_ms_per_query": flat_ms,
+        "index_ms_per_query": index_ms,
+    }
+    logger.info(f"Rapport recall : {report}")
+    return report
@@ -0,0 +1,205 @@
+import re
+import os
+import pickle
+import numpy as np
+
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEXICAL_PATH = "models/bm25.pkl"
+
+FUSION_METHODS = ("rrf", "weighted")
+# Constante de la fusion par rang réciproque (valeur usuelle)
+RRF_K = 60
+
+# "cs.LG", "q-bio.NC", "COVID-19" restent des tokens entiers
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+STOPWORDS = frozenset("""
+    a an and are as at be by for from in into is it its of on or that the this to with we our via using
+    le la les un une des du de et en dans pour par sur au aux est
+""".split())
+# Un terme du titre compte comme deux occurrences dans le résumé
+TITLE_WEIGHT = 2
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """Index inversé BM25 sur le titre, le résumé et les mots-clés des articles.
+
+    Les postings sont stockés en CSR : pour le terme t, `doc_ids[offsets[t]:offsets[t + 1]]`
+    (int32, triés) et le score BM25 déjà calculé de chaque occurrence (float32). Une requête
+    se réduit à des additions vectorisées ; le score maximal de chaque terme sert de borne
+    pour l'élagage MaxScore.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray,
+                 impacts: np.ndarray, size: int):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.size = size
+        self.max_impacts = np.array([
+            impacts[offsets[t]:offsets[t + 1]].max() if offsets[t + 1] > offsets[t] else 0.0
+            for t in range(len(vocabulary))
+        ], dtype="float32")
+
+    @staticmethod
+    def _document_terms(article: Dict[str, Any]) -> Counter:
+        counts = Counter()
+        for token in tokenize(article.get("title")):
+            counts[token] += TITLE_WEIGHT
+        keywords = article.get("keywords") or ""
+        subject_areas = article.get("subject_areas") or ""
+        # Le moissonneur remplit les deux champs avec les mêmes catégories
+        fields = [article.get("abstract"), keywords] + ([subject_areas] if subject_areas != keywords else [])
+        for field in fields:
+            counts.update(tokenize(field))
+        return counts
+
+    @classmethod
+    def from_metadata(cls, metadata: Iterable[Dict[str, Any]], k1: float = 1.2, b: float = 0.75) -> "LexicalIndex":
+        vocabulary: Dict[str, int] = {}
+        docs: List[array] = []
+        tfs: List[array] = []
+        lengths = array("l")
+
+        for pos, article in enumerate(metadata):
+            counts = cls._document_terms(article)
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(docs):
+                    docs.append(array("l"))
+                    tfs.append(array("l"))
+                docs[term_id].append(pos)
+                tfs[term_id].append(tf)
+
+        size = len(lengths)
+        offsets = np.zeros(len(vocabulary) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(d) for d in docs])
+        if not docs:
+            return cls(vocabulary, offsets, np.zeros(0, dtype="int32"), np.zeros(0, dtype="float32"), size)
+
+        doc_ids = np.concatenate([np.asarray(d, dtype="int32") for d in docs])
+        tf = np.concatenate([np.asarray(t, dtype="float32") for t in tfs])
+        lengths = np.asarray(lengths, dtype="float32")
+        df = np.diff(offsets).astype("float32")
+
+        # idf toujours positif (variante de Lucene) : les scores s'additionnent sans signe
+        idf = np.log(1 + (size - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * lengths[doc_ids] / max(lengths.mean(), 1e-9))
+        impacts = np.repeat(idf, np.diff(offsets)) * tf * (k1 + 1) / (tf + norm)
+        return cls(vocabulary, offsets, doc_ids, impacts.astype("float32"), size)
+
+    def save(self, path: str = LEXICAL_PATH):
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(path: str = LEXICAL_PATH) -> "LexicalIndex":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def search(self, query: str, k: int = 10, selection: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k BM25 : (positions, scores) par score décroissant, restreint à `selection` (trié) si fourni.
+
+        Seuls les articles présents dans les postings sont notés : le coût dépend des listes lues,
+        pas de la taille du corpus.
+        """
+        terms = list({self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary})
+        if not terms or k <= 0:
+            return np.zeros(0, dtype="int64"), np.zeros(0, dtype="float32")
+
+        # Termes à forte borne d'abord ; remaining[i] = score maximal encore apportable après le terme i
+        terms.sort(key=lambda t: -self.max_impacts[t])
+        bounds = self.max_impacts[terms]
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1][1:], [0.0]])
+
+        docs = np.zeros(0, dtype="int32")
+        scores = np.zeros(0, dtype="float32")
+        pruning = False
+        for term, rest in zip(terms, remaining):
+            start, end = self.offsets[term], self.offsets[term + 1]
+            postings, impacts = self.doc_ids[start:end], self.impacts[start:end]
+            if pruning:
+                # MaxScore : liste non essentielle, seulement sondée pour les candidats restants
+                idx = np.minimum(np.searchsorted(postings, docs), len(postings) - 1)
+                hit = postings[idx] == docs
+                scores[hit] += impacts[idx[hit]]
+            else:
+                if selection is not None:
+                    keep = _member(postings, selection)
+                    postings, impacts = postings[keep], impacts[keep]
+                if not len(docs):
+                    docs, scores = postings, impacts.copy()
+                elif len(docs) + len(postings) > self.size // 16:
+                    # Listes denses (termes fréquents) : accumulation directe, moins chère qu'un tri
+                    acc = np.bincount(np.concatenate([docs, postings]), weights=np.concatenate([scores, impacts]),
+                                      minlength=self.size)
+                    docs = np.flatnonzero(acc).astype("int32")
+                    scores = acc[docs].astype("float32")
+                else:
+                    # Union triée des candidats et de la liste, scores cumulés par article
+                    docs, inverse = np.unique(np.concatenate([docs, postings]), return_inverse=True)
+                    scores = np.bincount(inverse, weights=np.concatenate([scores, impacts]),
+                                         minlength=len(docs)).astype("float32")
+
+            if len(docs) >= k:
+                threshold = np.partition(scores, -k)[-k]
+                if rest < threshold:
+                    # Un article absent des candidats, ou qui ne peut plus atteindre le seuil, est écarté
+                    pruning = True
+                    keep = scores + rest >= threshold
+                    docs, scores = docs[keep], scores[keep]
+
+        if len(docs) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            docs, scores = docs[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return docs[order].astype("int64"), scores[order]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _member(values: np.ndarray, sorted_set: np.ndarray) -> np.ndarray:
+    # Masque "values[i] dans sorted_set", par recherche dichotomique
+    if len(sorted_set) == 0:
+        return np.zeros(len(values), dtype=bool)
+    idx = np.minimum(np.searchsorted(sorted_set, values), len(sorted_set) - 1)
+    return sorted_set[idx] == values
+
+
+def fuse(vector: Tuple[np.ndarray, np.ndarray], lexical: Tuple[np.ndarray, np.ndarray], k: int,
+         method: str = "rrf", alpha: float = 0.5) -> List[Tuple[int, float]]:
+    """Fusionne deux listes (positions, scores) triées ; renvoie les k meilleures (position, score dans [0, 1]).
+
+    "rrf" : somme des 1 / (RRF_K + rang), rapportée au maximum possible.
+    "weighted" : alpha * score vectoriel + (1 - alpha) * score BM25 rapporté au meilleur BM25.
+    """
+    fused: Dict[int, float] = {}
+    if method == "rrf":
+        best = alpha / (RRF_K + 1) + (1 - alpha) / (RRF_K + 1)
+        for weight, (positions, _) in ((alpha, vector), (1 - alpha, lexical)):
+            for rank, pos in enumerate(positions):
+                fused[int(pos)] = fused.get(int(pos), 0.0) + weight / (RRF_K + rank + 1)
+        fused = {pos: score / best for pos, score in fused.items()}
+    elif method == "weighted":
+        positions, scores = lexical
+        top = float(scores[0]) if len(scores) else 1.0
+        for pos, score in zip(*vector):
+            fused[int(pos)] = alpha * float(score)
+        for pos, score in zip(positions, scores):
+            fused[int(pos)] = fused.get(int(pos), 0.0) + (1 - alpha) * float(score) / top
+    else:
+        raise ValueError(f"Fusion inconnue : {method} (attendu : {', '.join(FUSION_METHODS)})")
+
+    return sorted(fused.items(), key=lambda item: -item[1])[:k]
@@ -0,0 +1,125 @@
+import os
+import json
+import shutil
+import numpy as np
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+METADATA_DIR = "models/metadata_store"
+
+STRING_COLUMNS = ("title", "abstract", "arxiv_identifier", "doi", "journal_name", "pdf_url", "authors",
+                  "keywords", "subject_areas")
+INT_COLUMNS = ("id", "publication_year")
+
+
+class MetadataStore:
+    """Métadonnées des articles en colonnes, lues par memory-map.
+
+    Chaque colonne texte est un blob UTF-8 (`<col>.blob`) plus un tableau d'offsets
+    (`<col>.offsets.npy`) ; les colonnes entières sont des `.npy`. Les valeurs nulles sont
+    marquées dans `<col>.null.npy`. Seule la ligne demandée est décodée : la mémoire du
+    processus ne dépend pas de la taille du corpus et les pages sont partagées entre workers.
+    """
+
+    def __init__(self, directory: str = METADATA_DIR):
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.directory = directory
+        self.size = manifest["size"]
+        self.string_columns = manifest["string_columns"]
+        self.int_columns = manifest["int_columns"]
+
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        self._offsets = {col: load(f"{col}.offsets.npy") for col in self.string_columns}
+        self._blobs = {col: self._map_blob(os.path.join(directory, f"{col}.blob")) for col in self.string_columns}
+        self._ints = {col: load(f"{col}.npy") for col in self.int_columns}
+        self._nulls = {col: load(f"{col}.null.npy") for col in self.string_columns + self.int_columns}
+
+    @staticmethod
+    def _map_blob(path: str) -> np.ndarray:
+        # np.memmap refuse les fichiers vides
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype="uint8")
+        return np.memmap(path, dtype="uint8", mode="r")
+
+    @staticmethod
+    def exists(directory: str = METADATA_DIR) -> bool:
+        return os.path.exists(os.path.join(directory, "manifest.json"))
+
+    @staticmethod
+    def write(records: Iterable[Dict[str, Any]], directory: str = METADATA_DIR):
+        """Écrit les enregistrements dans un dossier temporaire puis le substitue à `directory`."""
+        tmp_dir = directory + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        blobs = {col: open(os.path.join(tmp_dir, f"{col}.blob"), "wb") for col in STRING_COLUMNS}
+        offsets = {col: array("q", [0]) for col in STRING_COLUMNS}
+        ints = {col: array("q") for col in INT_COLUMNS}
+        nulls = {col: array("b") for col in STRING_COLUMNS + INT_COLUMNS}
+        size = 0
+        try:
+            for record in records:
+                size += 1
+                for col in STRING_COLUMNS:
+                    value = record.get(col)
+                    if isinstance(value, list):
+                        value = ", ".join(value)
+                    nulls[col].append(value is None)
+                    data = str(value).encode("utf-8") if value is not None else b""
+                    blobs[col].write(data)
+                    offsets[col].append(offsets[col][-1] + len(data))
+                for col in INT_COLUMNS:
+                    value = record.get(col)
+                    try:
+                        value = int(value)
+                    except (TypeError, ValueError):
+                        value = None
+                    nulls[col].append(value is None)
+                    ints[col].append(value if value is not None else 0)
+        finally:
+            for f in blobs.values():
+                f.close()
+
+        for col in STRING_COLUMNS:
+            np.save(os.path.join(tmp_dir, f"{col}.offsets.npy"), np.frombuffer(offsets[col], dtype="int64"))
+        for col in INT_COLUMNS:
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), np.frombuffer(ints[col], dtype="int64"))
+        for col, values in nulls.items():
+            np.save(os.path.join(tmp_dir, f"{col}.null.npy"), np.frombuffer(values, dtype="bool"))
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"size": size, "string_columns": list(STRING_COLUMNS), "int_columns": list(INT_COLUMNS)}, f)
+
+        # Substitution : les lecteurs déjà ouverts gardent l'ancienne version
+        old_dir = directory + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old_dir)
+        os.rename(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, idx: int, column: str) -> Optional[Any]:
+        if self._nulls[column][idx]:
+            return None
+        if column in self._ints:
+            return int(self._ints[column][idx])
+        offsets = self._offsets[column]
+        return bytes(self._blobs[column][offsets[idx]:offsets[idx + 1]]).decode("utf-8")
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        if not 0 <= idx < self.size:
+            raise IndexError(idx)
+        return {col: self.get(idx, col) for col in self.int_columns + self.string_columns}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for idx in range(self.size):
+            yield self[idx]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
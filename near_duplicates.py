@@ -0,0 +1,154 @@
+import re
+import zlib
+import numpy as np
+
+from array import array
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Plus grand nombre premier < 2^32 : (a * h + b) mod p tient sur 64 bits et le résultat sur 32
+_PRIME = np.uint64(4294967291)
+
+
+class MinHasher:
+    """Signatures MinHash sur des n-grammes de mots (shingles)."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        tokens = re.findall(r"\w+", text.lower())
+        if len(tokens) < self.shingle_size:
+            return {" ".join(tokens)} if tokens else set()
+        return {" ".join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # Une permutation par ligne : minimum de (a * h + b) mod p sur tous les shingles
+        return ((np.outer(self._a, hashes % _PRIME) + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+    """Index LSH (découpage des signatures en bandes) pour repérer les quasi-doublons en temps sous-quadratique.
+
+    Seuls les documents qui partagent au moins une bande sont comparés ; un candidat est
+    retenu si la similarité de Jaccard estimée atteint `threshold`.
+
+    Les documents sont numérotés dans l'ordre d'insertion. Leurs signatures uint32 sont rangées
+    dans un tableau numpy préalloué (agrandi par doublement) ; les bandes dans une table de
+    hachage à adressage ouvert (hachage de la bande -> dernier document inséré), chaque
+    document pointant vers le précédent de la même bande. Ni objet ni dictionnaire par document.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16, shingle_size: int = 3,
+                 capacity: int = 1024):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        # Coefficients impairs du hachage des bandes, un par ligne de la signature
+        self._mix = np.random.default_rng(0).integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._keys: List[Hashable] = []
+        self._signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        # Table des bandes (0 : case vide) et premier document de chaque chaîne (-1 : aucun)
+        self._slots = array("Q", bytes(8 * 2 * capacity * bands))
+        self._heads = array("i", [-1]) * len(self._slots)
+        self._used = 0
+        # Document précédent de la même bande, en position * bands + bande (-1 : fin de chaîne)
+        self._next = array("i")
+
+    def _band_hashes(self, signature: np.ndarray) -> List[int]:
+        # Somme modulo 2^64 des lignes pondérées ; bit de poids faible forcé pour ne jamais valoir 0
+        mixed = (signature.astype(np.uint64) * self._mix).reshape(self.bands, self.rows).sum(axis=1, dtype=np.uint64)
+        return (mixed | np.uint64(1)).tolist()
+
+    def _find(self, band_hash: int) -> int:
+        # Case de `band_hash`, ou case vide où l'insérer (sondage linéaire)
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = band_hash & mask
+        while slots[slot] != band_hash and slots[slot] != 0:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow_table(self):
+        slots, heads = self._slots, self._heads
+        self._slots = array("Q", bytes(8 * 2 * len(slots)))
+        self._heads = array("i", [-1]) * len(self._slots)
+        for slot, band_hash in enumerate(slots):
+            if band_hash:
+                new = self._find(band_hash)
+                self._slots[new] = band_hash
+                self._heads[new] = heads[slot]
+
+    def query(self, signature: np.ndarray) -> List[Tuple[Hashable, float]]:
+        candidates = set()
+        for band, band_hash in enumerate(self._band_hashes(signature)):
+            position = self._heads[self._find(band_hash)]
+            while position >= 0:
+                candidates.add(position)
+                position = self._next[position * self.bands + band]
+        if not candidates:
+            return []
+        positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = np.mean(self._signatures[positions] == signature, axis=1)
+        scored = [(self._keys[position], similarity)
+                  for position, similarity in zip(positions.tolist(), similarities.tolist())
+                  if similarity >= self.threshold]
+        return sorted(scored, key=lambda item: -item[1])
+
+    def insert(self, key: Hashable, signature: np.ndarray):
+        position = len(self._keys)
+        if position == len(self._signatures):
+            grown = np.zeros((2 * position, self._signatures.shape[1]), dtype=np.uint32)
+            grown[:position] = self._signatures
+            self._signatures = grown
+        self._keys.append(key)
+        self._signatures[position] = signature
+        for band_hash in self._band_hashes(signature):
+            # Table remplie au plus à moitié : les sondages restent courts
+            if 2 * (self._used + 1) > len(self._slots):
+                self._grow_table()
+            slot = self._find(band_hash)
+            if not self._slots[slot]:
+                self._slots[slot] = band_hash
+                self._used += 1
+            self._next.append(self._heads[slot])
+            self._heads[slot] = position
+
+    def add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """Ajoute le document, ou renvoie la clé de son représentant s'il s'agit d'un quasi-doublon."""
+        signature = self.hasher.signature(text)
+        if signature is None:
+            # Texte vide : rien à comparer
+            return None
+        matches = self.query(signature)
+        if matches:
+            return matches[0][0]
+        self.insert(key, signature)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def find_clusters(documents: Iterable[Tuple[Hashable, str]], **kwargs) -> Dict[Hashable, Hashable]:
+    """Associe chaque document à son représentant (le premier vu de son groupe de quasi-doublons)."""
+    index = NearDuplicateIndex(**kwargs)
+    representatives = {}
+    for key, text in documents:
+        match = index.add(key, text)
+        representatives[key] = key if match is None else match
+    return representatives
@@ -0,0 +1,118 @@
+import os
+import time
+import logging
+import numpy as np
+
+from typing import Any, Dict, List, Optional
+from lexical_index import tokenize
+from query_cache import TTLCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+RERANKERS = ("features", "cross-encoder")
+# Re-classement par défaut du moteur : désactivé sauf si RERANKER vaut "features" ou "cross-encoder"
+RERANKER = os.getenv("RERANKER", "")
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class FeatureScorer:
+    """Score peu coûteux : score de première étape + couverture des termes de la requête.
+
+    `score` ne calcule que la partie (requête, article), mise en cache ; le score de première
+    étape, qui dépend du mode et des filtres, est ajouté par Reranker avec `first_stage_weight`.
+    """
+
+    first_stage_weight = 0.5
+    # couverture du titre, couverture du résumé, requête présente telle quelle dans le titre
+    WEIGHTS = (0.25, 0.15, 0.10)
+
+    def score(self, query: str, results: List[Dict[str, Any]]) -> np.ndarray:
+        terms = set(tokenize(query))
+        phrase = normalize_query(query)
+        w_title, w_abstract, w_phrase = self.WEIGHTS
+        scores = []
+        for result in results:
+            score = 0.0
+            if terms:
+                title = result.get("title") or ""
+                score += w_title * len(terms & set(tokenize(title))) / len(terms)
+                score += w_abstract * len(terms & set(tokenize(result.get("abstract")))) / len(terms)
+                score += w_phrase * (phrase in normalize_query(title))
+            scores.append(score)
+        return np.array(scores, dtype="float32")
+
+
+class CrossEncoderScorer:
+    """Cross-encoder (requête, titre + résumé) : plus précis, à réserver aux premiers candidats."""
+
+    first_stage_weight = 0.0
+
+    def __init__(self, model_name: str = CROSS_ENCODER_MODEL, max_length: int = 256):
+        from sentence_transformers import CrossEncoder
+        # Une seule sortie : activation sigmoïde, scores dans [0, 1]
+        self.model = CrossEncoder(model_name, max_length=max_length)
+
+    def score(self, query: str, results: List[Dict[str, Any]]) -> np.ndarray:
+        pairs = [[query, f"{result.get('title') or ''}. {result.get('abstract') or ''}"] for result in results]
+        return np.asarray(self.model.predict(pairs, batch_size=len(pairs), convert_to_numpy=True), dtype="float32")
+
+
+class Reranker:
+    """Re-classe les `top_n` premiers résultats, par lots, dans un budget de temps par requête.
+
+    Les scores (requête, article) récents sont mis en cache. Si le budget est épuisé, seul le
+    préfixe de candidats notés est re-classé ; la suite garde l'ordre de la première étape.
+    """
+
+    def __init__(self, scorer, top_n: int = 20, batch_size: int = 16, budget_ms: Optional[float] = 150,
+                 cache_size: int = 4096, cache_ttl: float = 3600):
+        self.scorer = scorer
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.over_budget = 0
+
+    @staticmethod
+    def _doc_key(result: Dict[str, Any]):
+        return result.get("pdf_url") or result.get("title")
+
+    def rerank(self, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        candidates, rest = results[:self.top_n], results[self.top_n:]
+        query_key = normalize_query(query)
+        keys = [(query_key, self._doc_key(result)) for result in candidates]
+        scores = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        for offset in range(0, len(missing), self.batch_size):
+            if self.budget_ms is not None and (time.perf_counter() - start) * 1000 >= self.budget_ms:
+                self.over_budget += 1
+                logger.warning(f"Re-classement interrompu : budget de {self.budget_ms} ms dépassé")
+                break
+            batch = missing[offset:offset + self.batch_size]
+            for i, score in zip(batch, self.scorer.score(query, [candidates[i] for i in batch])):
+                scores[i] = float(score)
+                self.cache.set(keys[i], scores[i])
+
+        # Un candidat noté (via le cache) après un candidat non noté ne doit pas le dépasser :
+        # seul le préfixe entièrement noté est re-classé
+        prefix = next((i for i, score in enumerate(scores) if score is None), len(scores))
+        weight = getattr(self.scorer, "first_stage_weight", 0.0)
+        reranked = []
+        for i in range(prefix):
+            result = dict(candidates[i])
+            result["rerank_score"] = scores[i] + weight * float(result.get("similarity_score") or 0.0)
+            reranked.append(result)
+        reranked.sort(key=lambda result: -result["rerank_score"])
+        return reranked + candidates[prefix:] + rest
+
+
+def load_reranker(name: Optional[str] = RERANKER, **kwargs) -> Optional[Reranker]:
+    if not name:
+        return None
+    if name == "features":
+        return Reranker(FeatureScorer(), **kwargs)
+    if name == "cross-encoder":
+        return Reranker(CrossEncoderScorer(), **kwargs)
+    raise ValueError(f"Re-classement inconnu : {name} (attendu : {', '.join(RERANKERS)})")
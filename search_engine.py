@@ -1,29 +1,246 @@
+import os
+import logging
+import threading
 import faiss
+import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
+from encoders import ENCODER_BACKEND, load_encoder
+from index_factory import enable_reconstruct, load_params, prepare_vectors, search_index, similarity_scores
+from search_filters import POSTINGS_PATH, PostingLists
+from lexical_index import LEXICAL_PATH, LexicalIndex, fuse
+from reranker import RERANKER, load_reranker
+from metadata_store import METADATA_DIR, MetadataStore
+from query_cache import TTLCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+# Profondeur des listes vectorielle et BM25 avant fusion
+HYBRID_DEPTH = 50
+
+# Registre des moteurs partagés par tout le processus (sessions Streamlit, service HTTP...)
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_search_engine(index_path='models/arxiv_abstracts.index', metadata_path='models/metadata.pkl'):
+    """Retourne le moteur partagé pour cet index, chargé au premier appel."""
+    key = (os.path.abspath(index_path), os.path.abspath(metadata_path))
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = ScopusSearchEngine(index_path=index_path, metadata_path=metadata_path)
+                _engines[key] = engine
+    return engine
+
 
 class ScopusSearchEngine:
-    def __init__(self, index_path='models/arxiv_abstracts.index', metadata_path='models/metadata.pkl'):
-        self.index = faiss.read_index(index_path)
-        self.metadata = pd.read_pickle(metadata_path)
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-
-    def search(self, query, k=5):
-        query_embedding = self.model.encode([query]).astype('float32')
-        distances, indices = self.index.search(query_embedding, k)
-
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if 0 <= idx < len(self.metadata):
-                row = self.metadata[idx] if isinstance(self.metadata, list) else self.metadata.iloc[idx]
-                result = {
-                    "title": row.get("title", "Titre inconnu"),
-                    "abstract": row.get("abstract", "Résumé indisponible"),
-                    "authors": ', '.join(row["authors"]) if isinstance(row.get("authors"), list) else row.get("authors", "Auteurs inconnus"),
-                    "publication_year": row.get("publication_year", "Année inconnue"),
-                    "pdf_url": row.get("pdf_url", None),
-                    "similarity_score": max(0, 1 - (distance / 4))
-                }
-                results.append(result)
-
-        return sorted(results, key=lambda x: x["similarity_score"], reverse=True)
+    def __init__(self, index_path='models/arxiv_abstracts.index', metadata_path='models/metadata.pkl',
+                 postings_path=POSTINGS_PATH, metadata_dir=METADATA_DIR,
+                 embedding_cache_size=1024, result_cache_size=256, cache_ttl=3600,
+                 encoder_backend=ENCODER_BACKEND, lexical_path=LEXICAL_PATH,
+                 search_mode="vector", fusion="rrf", fusion_alpha=0.5, reranker=RERANKER):
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.postings_path = postings_path
+        self.metadata_dir = metadata_dir
+        self.lexical_path = lexical_path
+        # Vectoriel par défaut (score = similarité cosinus). "hybrid" fusionne les listes FAISS
+        # et BM25 (rang réciproque ou somme pondérée) : le score est alors celui de la fusion
+        self.search_mode = search_mode
+        self.fusion = fusion
+        self.fusion_alpha = fusion_alpha
+        # Re-classement optionnel des premiers candidats : nom ("features", "cross-encoder") ou instance
+        self.reranker = load_reranker(reranker) if isinstance(reranker, str) or reranker is None else reranker
+        # "torch", "onnx" ou "onnx-int8" (ONNX Runtime, plus rapide sur CPU)
+        self.model = load_encoder('all-MiniLM-L6-v2', encoder_backend)
+
+        # Caches requête -> embedding et (requête, k, filtres) -> résultats
+        self.embedding_cache = TTLCache(maxsize=embedding_cache_size, ttl=cache_ttl)
+        self.result_cache = TTLCache(maxsize=result_cache_size, ttl=cache_ttl)
+
+        self._lock = threading.Lock()
+        self._load()
+
+    def _index_version(self):
+        return os.stat(self.index_path).st_mtime_ns
+
+    def _load(self):
+        # Version relevée avant la lecture : un index remplacé entre-temps sera rechargé au prochain appel.
+        # Les attributs ne sont remplacés qu'une fois tout chargé, et la version en dernier.
+        version = self._index_version()
+        index = faiss.read_index(self.index_path)
+        index_params = load_params(self.index_path)
+        # Métadonnées en colonnes memory-mappées, lues à la demande ; pickle en repli
+        if MetadataStore.exists(self.metadata_dir):
+            metadata = MetadataStore(self.metadata_dir)
+        else:
+            metadata = pd.read_pickle(self.metadata_path)
+        if index.ntotal != len(metadata):
+            raise RuntimeError(f"Index ({index.ntotal} vecteurs) et métadonnées ({len(metadata)} articles) désalignés")
+        # Avant tout partage entre threads : la recherche filtrée relit des vecteurs de l'index
+        enable_reconstruct(index)
+
+        # Listes de positions par année / auteur ; reconstruites si absentes ou périmées
+        records = metadata.to_dict('records') if isinstance(metadata, pd.DataFrame) else metadata
+        postings = PostingLists.load(self.postings_path) if os.path.exists(self.postings_path) else None
+        # (listes antérieures aux IDs d'auteurs : sans `author_keys`)
+        if postings is None or postings.size != len(metadata) or not hasattr(postings, "author_keys"):
+            postings = PostingLists.from_metadata(records)
+
+        self.index, self.index_params, self.metadata = index, index_params, metadata
+        # Index BM25 chargé à la première recherche lexicale ou hybride (voir _load_lexical)
+        self.postings, self.lexical = postings, None
+        self.index_version = version
+
+    def _load_lexical(self):
+        # Index BM25 (titre, résumé, mots-clés) ; reconstruit s'il est absent ou périmé.
+        # Appelé sous verrou : le mode vectoriel ne paie ni son chargement ni sa mémoire.
+        lexical = LexicalIndex.load(self.lexical_path) if os.path.exists(self.lexical_path) else None
+        if lexical is None or lexical.size != len(self.metadata):
+            records = self.metadata.to_dict('records') if isinstance(self.metadata, pd.DataFrame) else self.metadata
+            lexical = LexicalIndex.from_metadata(records)
+        self.lexical = lexical
+
+    def _snapshot(self, lexical=False):
+        # Index reconstruit sur disque : rechargement et invalidation des caches.
+        # Les références sont lues sous verrou pour qu'une recherche n'associe jamais
+        # un index rechargé à d'anciennes métadonnées.
+        with self._lock:
+            if self._index_version() != self.index_version:
+                try:
+                    self._load()
+                except Exception as e:
+                    # Fichiers en cours d'écriture : l'ancienne version reste servie, nouvel essai au prochain appel
+                    logger.warning(f"Rechargement de l'index reporté : {e}")
+                else:
+                    self.embedding_cache.clear()
+                    self.result_cache.clear()
+            if lexical and self.lexical is None:
+                self._load_lexical()
+            return self.index, self.index_params, self.metadata, self.postings, self.lexical
+
+    def cache_stats(self):
+        stats = {"embeddings": self.embedding_cache.stats(), "results": self.result_cache.stats()}
+        if self.reranker is not None:
+            stats["rerank"] = {**self.reranker.cache.stats(), "over_budget": self.reranker.over_budget}
+        return stats
+
+    def _encode_queries(self, queries, index_params):
+        keys = [normalize_query(query) for query in queries]
+        vectors = [self.embedding_cache.get(key) for key in keys]
+
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+        if missing:
+            encoded = prepare_vectors(self.model.encode(missing), index_params)
+            for key, vector in zip(missing, encoded):
+                self.embedding_cache.set(key, vector)
+            fresh = dict(zip(missing, encoded))
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return np.vstack(vectors)
+
+    def search(self, query, k=5, nprobe=None, ef_search=None, min_score=None,
+               year_from=None, year_to=None, authors=None, mode=None, rerank=True):
+        return self.search_batch(
+            [query], k=k, nprobe=nprobe, ef_search=ef_search, min_score=min_score,
+            year_from=year_from, year_to=year_to, authors=authors, mode=mode, rerank=rerank
+        )[0]
+
+    def search_batch(self, queries, k=5, nprobe=None, ef_search=None, min_score=None,
+                     year_from=None, year_to=None, authors=None, mode=None, rerank=True):
+        """Recherche groupée : un seul encodage et un seul appel FAISS pour toutes les requêtes.
+
+        `mode` : "vector", "lexical" (BM25) ou "hybrid" (défaut du moteur : "vector").
+        Hors mode vectoriel, `similarity_score` et `min_score` portent sur le score fusionné dans [0, 1].
+        `rerank` : re-classer les premiers candidats si le moteur a un re-classement.
+        """
+        if not queries:
+            return []
+
+        mode = mode or self.search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Mode de recherche inconnu : {mode} (attendu : {', '.join(SEARCH_MODES)})")
+
+        snapshot = self._snapshot(lexical=mode != "vector")
+
+        options = (k, nprobe, ef_search, min_score, year_from, year_to, tuple(sorted(authors or ())),
+                   mode, self.fusion, self.fusion_alpha, rerank and self.reranker is not None)
+        keys = [(normalize_query(query),) + options for query in queries]
+        all_results = [self.result_cache.get(key) for key in keys]
+        pending = [i for i, results in enumerate(all_results) if results is None]
+
+        if pending:
+            for i, results in zip(pending, self._search_uncached(
+                snapshot, [queries[i] for i in pending], k, nprobe, ef_search, min_score, year_from, year_to, authors, mode,
+                rerank
+            )):
+                self.result_cache.set(keys[i], results)
+                all_results[i] = results
+
+        # Copies : les appelants peuvent modifier les résultats sans altérer le cache
+        return [[dict(result) for result in results] for results in all_results]
+
+    def _search_uncached(self, snapshot, queries, k, nprobe, ef_search, min_score, year_from, year_to, authors,
+                         mode="vector", rerank=False):
+        index, index_params, metadata, postings, lexical = snapshot
+        reranker = self.reranker if rerank else None
+        # Le re-classement a besoin d'au moins top_n candidats
+        limit = max(k, reranker.top_n) if reranker is not None else k
+
+        # Filtres résolus en positions et appliqués pendant la recherche FAISS et BM25
+        selection = postings.select(year_from=year_from, year_to=year_to, authors=authors)
+        if selection is not None and len(selection) == 0:
+            return [[] for _ in queries]
+
+        depth = limit if mode == "vector" else max(limit, HYBRID_DEPTH)
+        empty = (np.zeros(0, dtype="int64"), np.zeros(0, dtype="float32"))
+        vector_hits = [empty] * len(queries)
+        if mode != "lexical":
+            query_embeddings = self._encode_queries(queries, index_params)
+            distances, indices = search_index(index, index_params, query_embeddings, depth,
+                                              nprobe=nprobe, ef_search=ef_search, selection=selection)
+            scores = similarity_scores(distances, index_params)
+            vector_hits = []
+            for row_indices, row_scores in zip(indices, scores):
+                valid = (row_indices >= 0) & (row_indices < len(metadata))
+                vector_hits.append((row_indices[valid], row_scores[valid]))
+
+        all_results = []
+        for query, (row_indices, row_scores) in zip(queries, vector_hits):
+            if mode == "vector":
+                ranked = zip(row_indices, row_scores)
+            else:
+                lexical_hits = lexical.search(query, depth, selection=selection)
+                if mode == "lexical":
+                    # Score BM25 rapporté au meilleur résultat
+                    ranked = fuse(empty, lexical_hits, limit, method="weighted", alpha=0.0)
+                else:
+                    ranked = fuse((row_indices, row_scores), lexical_hits, limit,
+                                  method=self.fusion, alpha=self.fusion_alpha)
+
+            # Résultats déjà ordonnés : le seuil coupe la fin de liste
+            results = [
+                self._make_result(metadata, idx, score)
+                for idx, score in ranked
+                if min_score is None or score >= min_score
+            ]
+            if reranker is not None:
+                results = reranker.rerank(query, results)
+            all_results.append(results[:k])
+
+        return all_results
+
+    @staticmethod
+    def _make_result(metadata, idx, score):
+        row = metadata.iloc[idx] if isinstance(metadata, pd.DataFrame) else metadata[idx]
+        return {
+            "title": row.get("title", "Titre inconnu"),
+            "abstract": row.get("abstract", "Résumé indisponible"),
+            "authors": ', '.join(row["authors"]) if isinstance(row.get("authors"), list) else row.get("authors", "Auteurs inconnus"),
+            "publication_year": row.get("publication_year", "Année inconnue"),
+            "pdf_url": row.get("pdf_url", None),
+            "similarity_score": float(score)
+        }
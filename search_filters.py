@@ -0,0 +1,126 @@
+import os
+import pickle
+import numpy as np
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+POSTINGS_PATH = "models/postings.pkl"
+
+# Séparateur utilisé par GROUP_CONCAT dans semantic_index.py (repli sans table author_article)
+AUTHORS_SEPARATOR = ", "
+
+
+def _to_year(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PostingLists:
+    """Listes de positions (lignes de l'index FAISS) par année et par auteur.
+
+    Les filtres de recherche sont résolus ici en un tableau trié de positions, passé
+    ensuite à FAISS sous forme d'IDSelector : la recherche renvoie directement k
+    résultats filtrés, sans sur-échantillonnage.
+
+    Les auteurs sont identifiés par leur ID (table author_article) : un nom renvoie à
+    tous les IDs qui le portent, et les noms contenant une virgule restent entiers.
+    """
+
+    def __init__(self, years: Dict[int, np.ndarray], unknown_years: np.ndarray,
+                 authors: Dict[Hashable, np.ndarray], size: int,
+                 author_keys: Optional[Dict[str, Tuple[Hashable, ...]]] = None):
+        self.years = years
+        self.unknown_years = unknown_years
+        # ID d'auteur -> positions triées ; nom -> IDs d'auteurs
+        self.authors = authors
+        self.author_keys = author_keys if author_keys is not None else {name: (name,) for name in authors}
+        self.size = size
+        self._sorted_years = np.array(sorted(years), dtype="int64")
+
+    @classmethod
+    def from_metadata(cls, metadata: Iterable[Dict[str, Any]],
+                      links: Optional[Iterable[Tuple[int, str, int]]] = None) -> "PostingLists":
+        """`links` : triplets (author_id, full_name, article_id) de author_article.
+
+        Sans `links`, les auteurs sont lus dans la chaîne `authors` des métadonnées
+        (anciens index) et le nom sert d'identifiant.
+        """
+        years: Dict[int, List[int]] = {}
+        unknown_years: List[int] = []
+        authors: Dict[Hashable, List[int]] = {}
+        positions: Dict[int, int] = {}
+        size = 0
+
+        for pos, article in enumerate(metadata):
+            size += 1
+            year = _to_year(article.get("publication_year"))
+            if year is None:
+                unknown_years.append(pos)
+            else:
+                years.setdefault(year, []).append(pos)
+
+            if links is not None:
+                if article.get("id") is not None:
+                    positions[int(article["id"])] = pos
+                continue
+            names = article.get("authors") or []
+            if isinstance(names, str):
+                names = names.split(AUTHORS_SEPARATOR)
+            for name in {n.strip() for n in names if n and n.strip()}:
+                authors.setdefault(name, []).append(pos)
+
+        author_keys = None
+        if links is not None:
+            keys: Dict[str, set] = {}
+            for author_id, full_name, article_id in links:
+                pos = positions.get(article_id)
+                if pos is None:
+                    # Article absent de l'index (sans résumé)
+                    continue
+                authors.setdefault(author_id, []).append(pos)
+                keys.setdefault(full_name.strip(), set()).add(author_id)
+            author_keys = {name: tuple(sorted(ids)) for name, ids in keys.items()}
+
+        return cls(
+            {year: np.array(p, dtype="int64") for year, p in years.items()},
+            np.array(unknown_years, dtype="int64"),
+            {key: np.unique(np.array(p, dtype="int64")) for key, p in authors.items()},
+            size,
+            author_keys,
+        )
+
+    def save(self, path: str = POSTINGS_PATH):
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(path: str = POSTINGS_PATH) -> "PostingLists":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def select(self, year_from: Optional[int] = None, year_to: Optional[int] = None,
+               authors: Optional[Iterable[str]] = None) -> Optional[np.ndarray]:
+        """Positions qui satisfont les filtres, ou None si aucun filtre n'est demandé."""
+        selection = None
+
+        if year_from is not None or year_to is not None:
+            in_range = self._sorted_years
+            if year_from is not None:
+                in_range = in_range[in_range >= year_from]
+            if year_to is not None:
+                in_range = in_range[in_range <= year_to]
+            # Comme dans l'application, un article sans année n'est pas exclu par le filtre d'années
+            parts = [self.years[year] for year in in_range] + [self.unknown_years]
+            selection = np.sort(np.concatenate(parts))
+
+        if authors:
+            # Union des postings de tous les IDs portant l'un des noms demandés
+            keys = {key for name in authors for key in self.author_keys.get(name, ())}
+            parts = [self.authors[key] for key in keys if key in self.authors]
+            by_author = np.unique(np.concatenate(parts)) if parts else np.array([], dtype="int64")
+            selection = by_author if selection is None else np.intersect1d(selection, by_author, assume_unique=True)
+
+        return selection
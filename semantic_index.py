@@ -1,12 +1,24 @@
 import os
 import pickle
 import logging
+import argparse
 import faiss
+import numpy as np
 
 from dotenv import load_dotenv
-from typing import List, Dict, Any
-from sqlalchemy import create_engine, text
-from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Any, Iterator, Optional
+from sqlalchemy import text
+from database import get_engine
+from embedding_cache import EmbeddingCache
+from encoders import ENCODER_BACKEND, ENCODER_BACKENDS, cache_name, load_encoder
+from embedding_pipeline import EmbeddingPipeline
+from search_filters import PostingLists
+from lexical_index import LexicalIndex
+from metadata_store import METADATA_DIR, MetadataStore
+from index_factory import (
+    DEFAULT_PARAMS, INDEX_TYPES, METRICS, build_index, load_params, save_params,
+    prepare_vectors, same_build, search_parameters, similarity_scores, recall_report
+)
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -20,11 +32,48 @@ MYSQL_DB = os.getenv("MYSQL_DATABASE")
 if not all([MYSQL_USER, MYSQL_PASSWORD is not None, MYSQL_HOST, MYSQL_DB]):
     raise EnvironmentError("Erreur : variables .env manquantes ou mal définies (MYSQL_USER, MYSQL_PASSWORD, etc.)")
 
-# Connexion SQLAlchemy
-engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}")
+# Connexion SQLAlchemy (moteur partagé, pool borné)
+engine = get_engine()
 
 # Créer dossier pour les modèles
 os.makedirs("models", exist_ok=True)
+# Nombre d'articles lus dans MySQL et encodés à la fois
+FETCH_CHUNK_SIZE = 5000
+INDEX_PATH = "models/arxiv_abstracts.index"
+# Ancien format des métadonnées (pickle), encore lu s'il n'existe pas de MetadataStore
+METADATA_PATH = "models/metadata.pkl"
+
+ARTICLES_QUERY = """
+    SELECT 
+        a.id,
+        a.title,
+        a.abstract,
+        a.publication_year,
+        a.arxiv_identifier,
+        a.doi,
+        a.journal_name,
+        a.pdf_url,
+        a.keywords,
+        a.subject_areas,
+        GROUP_CONCAT(au.full_name SEPARATOR ', ') AS authors
+    FROM 
+        article a
+    LEFT JOIN 
+        author_article aa ON a.id = aa.article_id
+    LEFT JOIN 
+        author au ON aa.author_id = au.id
+    WHERE 
+        a.abstract IS NOT NULL AND a.abstract != ''
+    GROUP BY 
+        a.id
+"""
+
+# Liens auteur-article des listes de positions par auteur (filtre par ID, pas par nom concaténé)
+AUTHOR_LINKS_QUERY = """
+    SELECT aa.author_id, au.full_name, aa.article_id
+    FROM author_article aa
+    JOIN author au ON aa.author_id = au.id
+"""
 
 # Logger
 logging.basicConfig(level=logging.INFO)
@@ -33,100 +82,255 @@ logger = logging.getLogger(__name__)
 # Classe SemanticSearch
 
 class SemanticSearch:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", incremental: bool = False,
+                 index_params: Optional[Dict[str, Any]] = None,
+                 encoder_options: Optional[Dict[str, Any]] = None, encoder_backend: str = ENCODER_BACKEND):
         self.model_name = model_name
-        self.model = SentenceTransformer(self.model_name)
+        self.encoder_backend = encoder_backend
+        self.model = load_encoder(self.model_name, encoder_backend)
+        encoder_options = encoder_options or {}
+        # batch_size, processes, threads, chunk_size, max_seq_length
+        self.pipeline = EmbeddingPipeline(self.model, **encoder_options)
+        # Une troncature différente donne d'autres vecteurs : cache séparé
+        name = cache_name(self.model_name, encoder_backend)
+        if encoder_options.get("max_seq_length"):
+            name = f"{name}@{self.model.max_seq_length}"
+        self.embedding_cache = EmbeddingCache(name)
         self.index = None
         self.metadata = []
-        self._build_index()
+        # Paramètres de l'index : ceux passés explicitement, sinon ceux persistés avec l'index
+        persisted = load_params(INDEX_PATH)
+        self.index_params = dict(persisted)
+        if index_params:
+            same_type = index_params.get("index_type", persisted["index_type"]) == persisted["index_type"]
+            self.index_params = {**(persisted if same_type else DEFAULT_PARAMS), **index_params}
+        has_metadata = MetadataStore.exists(METADATA_DIR) or os.path.exists(METADATA_PATH)
+        try:
+            if incremental and not same_build(persisted, self.index_params):
+                # Métrique, type ou paramètres de construction changés : l'index existant ne convient plus
+                logger.info("Paramètres de construction modifiés : reconstruction complète de l'index.")
+                self._build_index()
+            elif incremental and os.path.exists(INDEX_PATH) and has_metadata:
+                self._load_index()
+                self.update_index()
+            else:
+                self._build_index()
+        finally:
+            # Les processus d'encodage ne servent qu'à la construction
+            self.pipeline.close()
 
-    def _build_index(self):
+    def _iter_articles(self, chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
         logger.info("Récupération des articles depuis la base MySQL...")
 
+        # Curseur côté serveur : les lignes arrivent par morceaux
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(ARTICLES_QUERY))
+            for rows in result.partitions(chunk_size):
+                yield [
+                    {
+                        "id": row.id,
+                        "title": row.title,
+                        "abstract": row.abstract,
+                        "publication_year": row.publication_year,
+                        "arxiv_identifier": row.arxiv_identifier,
+                        "doi": row.doi,
+                        "journal_name": row.journal_name,
+                        "pdf_url": row.pdf_url,
+                        "keywords": row.keywords,
+                        "subject_areas": row.subject_areas,
+                        "authors": row.authors
+                    }
+                    for row in rows
+                ]
+
+    def _fetch_author_links(self) -> List[tuple]:
         with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT 
-                    a.id,
-                    a.title,
-                    a.abstract,
-                    a.publication_year,
-                    a.arxiv_identifier,
-                    a.doi,
-                    a.journal_name,
-                    a.pdf_url,
-                    GROUP_CONCAT(au.full_name SEPARATOR ', ') AS authors
-                FROM 
-                    article a
-                LEFT JOIN 
-                    author_article aa ON a.id = aa.article_id
-                LEFT JOIN 
-                    author au ON aa.author_id = au.id
-                WHERE 
-                    a.abstract IS NOT NULL AND a.abstract != ''
-                GROUP BY 
-                    a.id
-            """))
-            articles = result.fetchall()
-
-        if not articles:
+            return [tuple(row) for row in conn.execute(text(AUTHOR_LINKS_QUERY))]
+
+    def _fetch_articles(self) -> List[Dict[str, Any]]:
+        return [article for chunk in self._iter_articles() for article in chunk]
+
+    def _encode(self, abstracts: List[str]) -> np.ndarray:
+        # Seuls les résumés jamais vus par ce modèle passent par l'encodeur
+        return self.embedding_cache.encode(abstracts, self._encode_texts)
+
+    def _encode_texts(self, abstracts: List[str]) -> np.ndarray:
+        logger.info(f"Encodage de {len(abstracts)} résumés avec le modèle NLP...")
+        return self.pipeline.encode(abstracts)
+
+    def _save(self):
+        # Chaque fichier est écrit à côté puis renommé. L'index passe en dernier : sa date de
+        # modification déclenche le rechargement du moteur, qui trouve alors tout le reste à jour.
+        MetadataStore.write(self.metadata, METADATA_DIR)
+        PostingLists.from_metadata(self.metadata, links=self._fetch_author_links()).save()
+        LexicalIndex.from_metadata(self.metadata).save()
+        save_params(INDEX_PATH, self.index_params)
+        faiss.write_index(self.index, INDEX_PATH + ".tmp")
+        os.replace(INDEX_PATH + ".tmp", INDEX_PATH)
+
+    def _load_index(self):
+        self.index = faiss.read_index(INDEX_PATH)
+        if MetadataStore.exists(METADATA_DIR):
+            self.metadata = MetadataStore(METADATA_DIR).to_records()
+        else:
+            with open(METADATA_PATH, "rb") as f:
+                self.metadata = list(pickle.load(f))
+
+    def _build_index(self):
+        # Lecture et encodage morceau par morceau ; les index sans entraînement
+        # (flat, hnsw) reçoivent chaque morceau dès qu'il est encodé
+        streaming = self.index_params["index_type"] in ("flat", "hnsw")
+        self.metadata = []
+        self.index = None
+        chunks = []
+        for articles in self._iter_articles():
+            self.metadata.extend(articles)
+            embeddings = self._encode([article["abstract"] for article in articles])
+            if not streaming:
+                chunks.append(embeddings)
+            elif self.index is None:
+                self.index = build_index(embeddings, self.index_params)
+            else:
+                self.index.add(prepare_vectors(embeddings, self.index_params))
+
+        if not self.metadata:
             logger.warning("Aucun article trouvé.")
             return
 
-        abstracts = [row.abstract for row in articles]
-        self.metadata = [
-            {
-                "id": row.id,
-                "title": row.title,
-                "abstract": row.abstract,
-                "publication_year": row.publication_year,
-                "arxiv_identifier": row.arxiv_identifier,
-                "doi": row.doi,
-                "journal_name": row.journal_name,
-                "pdf_url": row.pdf_url,
-                "authors": row.authors  
-            }
-            for row in articles
+        if not streaming:
+            # IVF : l'entraînement a besoin de l'ensemble (échantillonné) des vecteurs
+            self.index = build_index(np.vstack(chunks), self.index_params)
+
+        # Sauvegarde
+        self._save()
+
+        rate = f"{self.pipeline.throughput():.0f} textes/s"
+        if self.pipeline.token_throughput():
+            rate += f", {self.pipeline.token_throughput():.0f} tokens/s"
+        logger.info(f" Index FAISS créé avec {len(self.metadata)} articles (encodage : {rate}).")
+
+    def update_index(self):
+        """Met à jour l'index existant : seuls les articles nouveaux ou modifiés sont encodés."""
+        if self.index is None or not self.metadata:
+            self._build_index()
+            return
+
+        articles = self._fetch_articles()
+        current = {article["id"]: article for article in articles}
+        positions = {article["id"]: pos for pos, article in enumerate(self.metadata)}
+
+        removed = []
+        updated = 0
+        for article_id, pos in positions.items():
+            article = current.get(article_id)
+            if article is None or article["abstract"] != self.metadata[pos]["abstract"]:
+                # Article supprimé ou résumé modifié : le vecteur doit être retiré
+                removed.append(pos)
+            elif article != self.metadata[pos]:
+                # Seules les métadonnées ont changé : pas de ré-encodage
+                self.metadata[pos] = article
+                updated += 1
+
+        removed_set = set(removed)
+        to_add = [
+            article for article in articles
+            if article["id"] not in positions or positions[article["id"]] in removed_set
         ]
 
-        logger.info("Encodage des résumés avec le modèle NLP...")
-        embeddings = self.model.encode(abstracts, show_progress_bar=True, convert_to_numpy=True).astype("float32")
+        if not removed and not to_add and not updated:
+            save_params(INDEX_PATH, self.index_params)
+            logger.info("Index FAISS déjà à jour.")
+            return
+
+        if removed:
+            self.metadata = [article for pos, article in enumerate(self.metadata) if pos not in removed_set]
+            if self.index_params["index_type"] == "flat":
+                # IndexFlat compacte les vecteurs restants en conservant leur ordre
+                self.index.remove_ids(np.array(sorted(removed), dtype="int64"))
+            else:
+                # IVF et HNSW ne renumérotent pas : reconstruction à partir du cache d'embeddings
+                self.index = None
 
-        dim = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
+        if self.index is None:
+            self.metadata.extend(to_add)
+            self.index = build_index(self._encode([article["abstract"] for article in self.metadata]), self.index_params)
+        elif to_add:
+            self.index.add(prepare_vectors(self._encode([article["abstract"] for article in to_add]), self.index_params))
+            self.metadata.extend(to_add)
 
-        # Sauvegarde
-        faiss.write_index(self.index, "models/arxiv_abstracts.index")
-        with open("models/metadata.pkl", "wb") as f:
-            pickle.dump(self.metadata, f)
+        self._save()
 
-        logger.info(f" Index FAISS créé avec {len(self.metadata)} articles.")
+        logger.info(
+            f" Index FAISS mis à jour : {len(to_add)} ajoutés/ré-encodés, {len(removed)} retirés, "
+            f"{updated} métadonnées modifiées ({len(self.metadata)} articles)."
+        )
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, top_k: int = 5, min_score: Optional[float] = None) -> List[Dict[str, Any]]:
         if self.index is None or not self.metadata:
             raise RuntimeError("L’index n’est pas initialisé.")
 
         logger.info(f"Requête utilisateur : {query}")
 
         
-        query_vector = self.model.encode([query], convert_to_numpy=True).astype("float32")
-        distances, indices = self.index.search(query_vector, top_k)
+        query_vector = prepare_vectors(self.model.encode([query], convert_to_numpy=True), self.index_params)
+        distances, indices = self.index.search(query_vector, top_k, params=search_parameters(self.index, self.index_params))
+        scores = similarity_scores(distances[0], self.index_params)
+
+        # FAISS renvoie les voisins du plus au moins similaire : pas de tri, coupure au seuil
+        keep = (indices[0] >= 0) & (indices[0] < len(self.metadata))
+        if min_score is not None:
+            keep &= scores >= min_score
 
         results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx >= len(self.metadata):
-                continue
+        for idx, score in zip(indices[0][keep], scores[keep]):
             article = self.metadata[idx].copy()
-            article["similarity_score"] = max(0, 1 - (distance / 4))  
+            article["similarity_score"] = float(score)
             results.append(article)
 
-        return sorted(results, key=lambda x: x["similarity_score"], reverse=True)
+        return results
 
 # execute
 
 if __name__ == "__main__":
-    search_engine = SemanticSearch()
-    query = "deep learning in medicine"
+    parser = argparse.ArgumentParser(description="Construction de l'index FAISS des résumés")
+    parser.add_argument("--incremental", action="store_true", help="Encoder uniquement les articles nouveaux ou modifiés")
+    parser.add_argument("--query", default="deep learning in medicine", help="Requête de démonstration")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="Type d'index FAISS (défaut : celui persisté)")
+    parser.add_argument("--nlist", type=int, help="IVF : nombre de listes")
+    parser.add_argument("--nprobe", type=int, help="IVF : listes visitées à la requête")
+    parser.add_argument("--ef-search", type=int, help="HNSW : largeur de recherche à la requête")
+    parser.add_argument("--metric", choices=METRICS, help="l2 (défaut) ou ip : similarité cosinus sur embeddings normalisés")
+    parser.add_argument("--batch-size", type=int, help="Taille des lots d'encodage")
+    parser.add_argument("--processes", type=int, help="Processus d'encodage (défaut : un par cœur)")
+    parser.add_argument("--threads", type=int, help="Threads torch par processus d'encodage")
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default=ENCODER_BACKEND, help="Backend d'encodage")
+    parser.add_argument("--max-seq-length", type=int, help="Tokens maximum par résumé (défaut : celui du modèle)")
+    parser.add_argument("--recall-report", type=int, metavar="K", help="Mesurer le recall@K par rapport à l'index exact")
+    args = parser.parse_args()
+
+    index_params = {
+        key: getattr(args, key)
+        for key in ("index_type", "metric", "nlist", "nprobe", "ef_search")
+        if getattr(args, key) is not None
+    }
+
+    encoder_options = {
+        key: getattr(args, key)
+        for key in ("batch_size", "processes", "threads", "max_seq_length")
+        if getattr(args, key) is not None
+    }
+
+    search_engine = SemanticSearch(incremental=args.incremental, index_params=index_params or None,
+                                   encoder_options=encoder_options, encoder_backend=args.backend)
+
+    if args.recall_report:
+        embeddings = search_engine._encode([article["abstract"] for article in search_engine.metadata])
+        report = recall_report(embeddings, search_engine.index_params, k=args.recall_report)
+        print(f"\nRecall@{args.recall_report} ({report['index_type']}) : {report[f'recall@{args.recall_report}']:.3f}")
+        print(f"   Latence exacte : {report['flat_ms_per_query']:.3f} ms/requête")
+        print(f"   Latence index  : {report['index_ms_per_query']:.3f} ms/requête")
+
+    query = args.query
     results = search_engine.search(query, top_k=3)
 
     print("\nRésultats de la recherche :")
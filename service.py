@@ -0,0 +1,238 @@
+import json
+import asyncio
+import logging
+import argparse
+import functools
+import numpy as np
+
+from aiohttp import web
+from concurrent.futures import ThreadPoolExecutor
+from chatbot import ScopusChatbot
+from search_engine import SEARCH_MODES, get_search_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Requêtes regroupées au plus par appel à search_batch
+MAX_BATCH = 32
+# Attente maximale d'autres requêtes avant de lancer un lot
+MAX_WAIT_MS = 5
+MAX_K = 100
+# Nombre de résultats d'une réponse du chatbot (comme ScopusChatbot.process_queries)
+CHAT_K = 5
+
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes de mêmes options en un seul search_batch.
+
+    Un lot part dès qu'il atteint `max_batch` requêtes ou après `max_wait_ms` ; l'encodage
+    et FAISS tournent dans le pool de threads pour ne pas bloquer la boucle asyncio.
+    """
+
+    def __init__(self, engine, executor, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.engine = engine
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._task = None
+        # Lots en cours : asyncio ne garde que des références faibles sur les tâches
+        self._inflight = set()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # Les lots déjà lancés vont au bout : leurs requêtes attendent une réponse
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def search(self, query, **options):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, tuple(sorted(options.items())), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # search_batch applique les mêmes options à toutes les requêtes d'un appel
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for options, items in groups.items():
+                task = asyncio.ensure_future(self._execute(dict(options), items))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, options, items):
+        self.batches += 1
+        self.requests += len(items)
+        call = functools.partial(self.engine.search_batch, [query for query, _, _ in items], **options)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+        }
+
+
+def _json_default(value):
+    # Valeurs numpy (années lues depuis l'ancien pickle pandas, scores...)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+def json_response(data, status=200):
+    return web.json_response(data, status=status,
+                             dumps=functools.partial(json.dumps, default=_json_default, ensure_ascii=False))
+
+
+def _optional_int(payload, key):
+    value = payload.get(key)
+    return None if value in (None, "") else int(value)
+
+
+def parse_search_options(payload):
+    """Options de recherche validées à partir du corps JSON ; ValueError si invalides."""
+    query = payload.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("Le champ 'query' doit être une chaîne non vide")
+
+    k = int(payload.get("k", CHAT_K))
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"'k' doit être compris entre 1 et {MAX_K}")
+
+    authors = payload.get("authors") or []
+    if isinstance(authors, str):
+        authors = [authors]
+    mode = payload.get("mode")
+    if mode is not None and mode not in SEARCH_MODES:
+        raise ValueError(f"'mode' doit valoir {', '.join(SEARCH_MODES)}")
+
+    rerank = payload.get("rerank", True)
+    if not isinstance(rerank, bool):
+        raise ValueError("'rerank' doit être un booléen JSON (true ou false)")
+
+    min_score = payload.get("min_score")
+    options = {
+        "k": k,
+        "year_from": _optional_int(payload, "year_from"),
+        "year_to": _optional_int(payload, "year_to"),
+        "authors": tuple(sorted(str(name) for name in authors)),
+        "min_score": None if min_score is None else float(min_score),
+        "mode": mode,
+        "rerank": rerank,
+    }
+    return query, options
+
+
+async def _read_json(request):
+    try:
+        payload = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Corps JSON invalide"}), content_type="application/json")
+    if not isinstance(payload, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Objet JSON attendu"}), content_type="application/json")
+    return payload
+
+
+async def handle_search(request):
+    payload = await _read_json(request)
+    try:
+        query, options = parse_search_options(payload)
+    except (TypeError, ValueError) as e:
+        return json_response({"error": str(e)}, status=400)
+
+    results = await request.app["batcher"].search(query, **options)
+    return json_response({"query": query, "results": results})
+
+
+async def handle_chat(request):
+    payload = await _read_json(request)
+    try:
+        query, options = parse_search_options({**payload, "k": payload.get("k", CHAT_K)})
+    except (TypeError, ValueError) as e:
+        return json_response({"error": str(e)}, status=400)
+
+    results = await request.app["batcher"].search(query, **options)
+    return json_response({"query": query, "answer": request.app["chatbot"].format_response(results),
+                          "results": results})
+
+
+async def handle_health(request):
+    engine = request.app["engine"]
+    return json_response({"status": "ok", "articles": len(engine.metadata), "index_size": engine.index.ntotal})
+
+
+async def handle_stats(request):
+    engine = request.app["engine"]
+    return json_response({"batching": request.app["batcher"].stats(), "caches": engine.cache_stats()})
+
+
+def create_app(workers=4, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, engine=None):
+    app = web.Application()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+
+    async def on_startup(app):
+        # Modèle, index et métadonnées chargés une seule fois, hors de la boucle asyncio
+        app["engine"] = engine or await asyncio.get_running_loop().run_in_executor(executor, get_search_engine)
+        app["chatbot"] = ScopusChatbot(app["engine"])
+        app["batcher"] = MicroBatcher(app["engine"], executor, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        app["batcher"].start()
+        logger.info(f"Service prêt : {len(app['engine'].metadata)} articles indexés")
+
+    async def on_cleanup(app):
+        await app["batcher"].stop()
+        executor.shutdown(wait=False)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_post("/search", handle_search)
+    app.router.add_post("/chat", handle_chat)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON de recherche d'articles")
+    parser.add_argument("--host", default="0.0.0.0", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8080, help="Port d'écoute")
+    parser.add_argument("--workers", type=int, default=4, help="Threads de recherche (encodage + FAISS)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Requêtes maximum par lot")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="Attente maximale avant d'envoyer un lot")
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.workers, args.max_batch, args.max_wait_ms), host=args.host, port=args.port)
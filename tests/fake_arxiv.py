@@ -0,0 +1,77 @@
+import threading
+import urllib.parse
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+
+class FakeArxiv:
+    """Faux serveur Atom local imitant l'API arXiv (search_query, start, max_results).
+
+    Chaque requête renvoie `total` articles ; les identifiants ne dépendent que du rang, si bien
+    que deux requêtes renvoient les mêmes articles (version v1 ou v2 selon la requête).
+    Les `failures` premiers appels répondent 503.
+    """
+
+    def __init__(self, total=250, failures=0):
+        self.total = total
+        self.failures = failures
+        self.calls = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}/api/query"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                query = params["search_query"][0]
+                start, count = int(params["start"][0]), int(params["max_results"][0])
+                with fake._lock:
+                    fake.calls.append((query, start))
+                    failing = fake.failures > 0
+                    fake.failures -= failing
+                if failing:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = fake.feed(query, start, count).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def feed(self, query, start, count):
+        version = 2 if query.endswith('"b"') else 1
+        entries = "".join(
+            f"""<entry>
+    <id>http://arxiv.org/abs/2001.{i:05d}v{version}</id>
+    <published>20{10 + i % 15}-01-01T00:00:00Z</published>
+    <title>Paper {i} {escape(query)}</title>
+    <summary>Abstract of paper {i}</summary>
+    <author><name>Author {i % 7}</name></author>
+    <link href="http://arxiv.org/pdf/2001.{i:05d}v{version}" type="application/pdf"/>
+    <category term="cs.LG"/>
+</entry>"""
+            for i in range(start, min(start + count, self.total))
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'
+
+    def starts(self, query):
+        return [start for q, start in self.calls if q == f'all:"{query}"']
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
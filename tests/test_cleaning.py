@@ -0,0 +1,22 @@
+import pandas as pd
+
+from cleaning import CorpusCleaner
+
+
+def frame(rows):
+    return pd.DataFrame([{"title": title, "arxiv_identifier": f"http://arxiv.org/abs/2001.{i:05d}v1"}
+                         for title, i in rows])
+
+
+def test_title_duplicate_does_not_claim_its_id():
+    # (T, 1), (T, 2), (U, 2) : comme drop_duplicates sur le titre puis sur l'identifiant, U est gardé
+    cleaned = CorpusCleaner().clean(frame([("T", 1), ("T", 2), ("U", 2)]))
+    assert list(cleaned["title"]) == ["T", "U"]
+
+
+def test_title_duplicate_does_not_claim_its_id_across_chunks():
+    cleaner = CorpusCleaner()
+    assert list(cleaner.clean(frame([("T", 1)]))["title"]) == ["T"]
+    assert list(cleaner.clean(frame([("T", 2)]))["title"]) == []
+    assert list(cleaner.clean(frame([("U", 2), ("V", 1)]))["title"]) == ["U"]
+    assert cleaner.stats()["duplicates"] == 2
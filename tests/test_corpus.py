@@ -0,0 +1,21 @@
+import gzip
+import json
+
+from corpus import iter_records
+
+
+def test_truncated_gzip_keeps_complete_records(tmp_path):
+    # Extraction interrompue pendant l'écriture du .jsonl.gz : gzip lève EOFError, pas JSONDecodeError
+    path = str(tmp_path / "corpus.jsonl.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for i in range(2000):
+            f.write(json.dumps({"id": i, "title": f"Paper {i}" * 5}) + "\n")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    records = list(iter_records(path))
+
+    assert 0 < len(records) < 2000
+    assert [record["id"] for record in records] == list(range(len(records)))
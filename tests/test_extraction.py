@@ -0,0 +1,99 @@
+import functools
+import json
+
+import pandas as pd
+
+import extraction
+from cleaning import canonical_arxiv_ids
+from corpus import iter_records
+from fake_arxiv import FakeArxiv
+
+
+class FakeClock:
+    """Horloge simulée : `sleep` avance le temps au lieu d'attendre."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def run(server, tmp_path, queries, max_results, workers=2):
+    return extraction.harvest(queries, max_results=max_results, workers=workers, min_interval=0,
+                              base_url=server.url, output_path=str(tmp_path / "corpus.jsonl"),
+                              checkpoint_path=str(tmp_path / "checkpoint.json"))
+
+
+def corpus(tmp_path):
+    return list(iter_records(str(tmp_path / "corpus.jsonl")))
+
+
+def test_resume_fetches_only_new_pages(tmp_path):
+    with FakeArxiv(total=250) as server:
+        assert run(server, tmp_path, ["a"], max_results=100) == 100
+        assert server.starts("a") == [0]
+
+        # Limite relevée : la requête terminée reprend à son offset
+        assert run(server, tmp_path, ["a"], max_results=300) == 150
+        assert server.starts("a") == [0, 100, 200]
+
+        # Limite inchangée : rien n'est redemandé
+        assert run(server, tmp_path, ["a"], max_results=300) == 0
+        assert server.starts("a") == [0, 100, 200]
+
+        # Limite relevée au-delà du flux : une seule page, vide, qui clôt la requête
+        assert run(server, tmp_path, ["a"], max_results=400) == 0
+        assert server.starts("a") == [0, 100, 200, 300]
+
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))
+    assert checkpoint["a"] == {"start": 300}
+    assert len(corpus(tmp_path)) == 250
+
+
+def test_retries_transient_errors(tmp_path, monkeypatch):
+    # Les nouveaux essais attendent 2 s, 4 s... : inutile contre le faux serveur
+    monkeypatch.setattr(extraction, "fetch_page", functools.partial(extraction.fetch_page, backoff=0))
+    with FakeArxiv(total=150, failures=2) as server:
+        assert run(server, tmp_path, ["a"], max_results=200, workers=1) == 150
+        # Deux 503 sur la première page, puis les pages 0 et 100
+        assert server.starts("a") == [0, 0, 0, 100]
+
+
+def test_deduplicates_across_queries_and_runs(tmp_path):
+    with FakeArxiv(total=120) as server:
+        # "b" renvoie les mêmes articles en version v2 : écartés comme doublons
+        assert run(server, tmp_path, ["a", "b"], max_results=200) == 120
+        # Nouveau passage sans point de reprise (--fresh) : tout est déjà dans le corpus
+        (tmp_path / "checkpoint.json").unlink()
+        assert run(server, tmp_path, ["a", "b"], max_results=200) == 0
+
+    records = corpus(tmp_path)
+    assert len(records) == 120
+    assert all("canonical_id" not in record for record in records)
+    assert canonical_arxiv_ids(pd.Series([r["arxiv_identifier"] for r in records])).is_unique
+
+
+def test_rate_limiter_spaces_consecutive_calls():
+    clock = FakeClock()
+    limiter = extraction.RateLimiter(min_interval=3.0, clock=clock, sleep=clock.sleep)
+    calls = []
+    for _ in range(3):
+        limiter.wait()
+        calls.append(clock.now)
+    assert [b - a for a, b in zip(calls, calls[1:])] == [3.0, 3.0]
+
+    # Appel arrivant après l'intervalle : aucune attente
+    clock.now += 10
+    limiter.wait()
+    assert clock.sleeps == [3.0, 3.0]
+
+    # Temps écoulé entre deux appels décompté de l'attente
+    clock.now += 1
+    limiter.wait()
+    assert clock.sleeps == [3.0, 3.0, 2.0]
@@ -0,0 +1,32 @@
+import faiss
+import numpy as np
+import pytest
+
+from index_factory import DEFAULT_PARAMS, search_index
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((20000, 32)).astype("float32"), rng.standard_normal((20, 32)).astype("float32")
+
+
+@pytest.mark.parametrize("kind", ["ivf_flat", "hnsw"])
+def test_selective_filter_returns_k_exact_hits(vectors, kind):
+    # 0,5 % du corpus retenu : IVF et HNSW seuls n'en croisaient qu'une partie
+    x, queries = vectors
+    if kind == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(32), 32, 256)
+        index.train(x)
+    else:
+        index = faiss.IndexHNSWFlat(32, 32)
+    index.add(x)
+    selection = np.arange(0, len(x), 200)
+
+    distances, positions = search_index(index, DEFAULT_PARAMS, queries, 10, selection=selection)
+
+    flat = faiss.IndexFlatL2(32)
+    flat.add(x[selection])
+    expected_distances, expected = flat.search(queries, 10)
+    assert (positions == selection[expected]).all()
+    assert np.allclose(distances, expected_distances, rtol=1e-4, atol=1e-3)